@@ -1,14 +1,20 @@
 import streamlit as st
 import os
 import json
-import re
 import zipfile
 import io
+import uuid
+import copy
 from github_manager import GithubManager
 from datetime import datetime
-from PIL import Image
-from ocr_engine import LocandineOCR
+from ocr_engine import LocandineOCR, warm_up_shared_reader, shared_reader_status
 from word_generator import WordGenerator
+from batch_ocr import iter_analyze_posters, DEFAULT_WORKERS
+from ocr_jobs import OCRJobQueue, DONE as JOB_DONE, STATUS_LABELS as JOB_STATUS_LABELS
+from date_utils import parse_italian_date, refresh_date_iso
+from event_parser import parse_event_text, make_ocr_record, reparse_events, is_stale
+from event_store import EventStore, EventIndex, EventCache, ConflictError, editable_copy, edited_fields
+from upload_store import UploadStore
 try:
     from streamlit_mic_recorder import speech_to_text
 except ImportError:
@@ -18,101 +24,34 @@ except ImportError:
 # Usa il parametro moderno 'width' (valido per st.image(), NON per button/download_button)
 IMG_WIDTH_ARG = {"width": "stretch"}
 
-# --- FUNZIONE DI PARSING INTELLIGENTE ---
-def parse_event_text(text):
-    """
-    Analizza il testo OCR e lo suddivide nei campi specifici richiesti.
-    """
-    data = {
-        'title': '', 'date': '', 'location': '', 'description': '',
-        'time': '', 'venue': '', 'address': ''
-    }
-    
-    if not text:
-        return data
+# Descrizione del percorso seguito dall'OCR (vedi LocandineOCR.analyze_poster)
+OCR_PATH_LABELS = {
+    'full': "pagina intera",
+    'roi_top': "solo intestazione (uscita anticipata)",
+    'roi_top+bottom': "intestazione + didascalia (uscita anticipata)",
+    'roi_fallback_full': "intestazione insufficiente, letta la pagina intera",
+}
 
-    lines = [l.strip() for l in text.split('\n') if l.strip()]
-    
-    # 1. Analisi Prima Riga (Solitamente DATA - LUOGO)
-    if len(lines) > 0:
-        first_line = lines[0]
-        # Cerca separatore "–" o "-"
-        parts = re.split(r'\s+[–-]\s+', first_line, maxsplit=1)
-        
-        # Estrazione Data
-        raw_date = parts[0].strip()
-        # Aggiungi anno 2026 se non presente e se sembra una data
-        if raw_date and '2026' not in raw_date and not re.search(r'\d{4}', raw_date):
-             # Evita di aggiungerlo se la stringa è spazzatura corta
-            if len(raw_date) > 3: 
-                raw_date += " 2026"
-        data['date'] = raw_date
-        
-        # Estrazione Luogo (Parte dopo il trattino nella prima riga)
-        if len(parts) > 1:
-            data['location'] = parts[1].strip()
+# Eventi per pagina nel Tab "Modifica Dati"
+PAGE_SIZES = [10, 20, 50]
+THUMB_WIDTH = 480
 
-    # 2. Analisi Righe Successive (Descrizione, Orario, Presso)
-    if len(lines) > 1:
-        rest_text = " ".join(lines[1:])
-        
-        # Cerca pattern Orario (es. Ore 16:30, 16.30, 16,30)
-        time_match = re.search(r'(?:Ore|ore)\s*(\d{1,2}[:.,]\d{2})', rest_text)
-        
-        if time_match:
-            # Normalizza orario con i due punti
-            data['time'] = time_match.group(1).replace('.', ':').replace(',', ':')
-            
-            # Testo PRIMA dell'orario -> Solitamente la DESCRIZIONE
-            pre_time = rest_text[:time_match.start()].strip()
-            # Pulisce trattini finali
-            data['description'] = pre_time.rstrip(' –-')
-            
-            # Testo DOPO l'orario -> Solitamente il PRESSO (Luogo specifico)
-            post_time = rest_text[time_match.end():].strip()
-            if post_time.startswith('–') or post_time.startswith('-'):
-                post_time = post_time[1:].strip()
-            data['venue'] = post_time
-        else:
-            # Se non trova l'orario, considera tutto descrizione
-            data['description'] = rest_text
+# Filtri di stato del Tab "Modifica Dati"
+STATUS_FILTERS = ["Tutti", "🆕 Nuovi", "📅 In programma", "🚫 Scaduti", "👯 Duplicati", "❓ Senza data"]
 
-    # 3. Ricerca Indirizzo (Via, Piazza, ecc.) nel testo completo
-    address_match = re.search(r'(?:Via|Vico|Piazza|Corso|Largo|Strada)\s+[A-Z][a-z]+.*?\d+', text, re.IGNORECASE)
-    if address_match:
-        data['address'] = address_match.group(0)
+# Ogni quanto il Tab "Modifica Dati" controlla le modifiche fatte da altre sessioni
+SYNC_INTERVAL = "20s"
 
-    # Titolo di default se vuoto usa la descrizione troncata
-    if not data['title']:
-        data['title'] = data['description'][:50] + "..." if data['description'] else "Nuovo Evento"
-    
-    return data
+# Campi dell'editor di un evento -> prefissi delle chiavi dei widget (seguiti dall'id)
+EDITOR_FIELDS = {'title': "e_tit_", 'date': "e_dat_", 'time': "e_tim_", 'location': "e_loc_",
+                 'venue': "e_ven_", 'address': "e_add_", 'description': "e_des_"}
+EDITOR_LABELS = {'title': "Titolo", 'date': "Data", 'time': "Orario", 'location': "Luogo",
+                 'venue': "Presso", 'address': "Indirizzo", 'description': "Descrizione"}
+# "form_": valori con cui è stato caricato il modulo (per riconoscere le modifiche non salvate)
+EVENT_WIDGET_PREFIXES = tuple(EDITOR_FIELDS.values()) + ("form_",)
 
-# --- FUNZIONE DI PARSING DA JSON ---
-def parse_json_event(json_entry, image_base_path="uploads"):
-    """
-    Parsare un evento dal formato JSON locandine.json.
-    Usa la stessa logica di 'parse_event_text' per coerenza,
-    rispettando la struttura a righe del testo.
-    """
-    text = json_entry.get('text', '')
-    image_file = json_entry.get('image_file', '')
-    
-    # Usa il parser principale (che gestisce meglio newlines e struttura)
-    data = parse_event_text(text)
-    
-    # Aggiungi percorso immagine
-    if image_file:
-        # Forza l'uso di / anche su Windows per compatibilità Cloud
-        data['image_path'] = f"{image_base_path}/{image_file}"
-        
-    # Fallback per il titolo se il parser lo ha lasciato vuoto o generico
-    # (sovrascrive solo se title manca o è quello di default)
-    if not data.get('title') or data.get('title') == "Nuovo Evento":
-        if data.get('date') and data.get('location'):
-             data['title'] = f"{data['date']} – {data['location']}"
-    
-    return data
+# --- PARSING ---
+# parse_event_text e parse_json_event vivono in event_parser.py, condiviso con ocr_engine
 
 # --- CONFIGURAZIONE PAGINA ---
 st.set_page_config(page_title="Locandine2Word", page_icon="🎭", layout="wide")
@@ -141,30 +80,429 @@ GITHUB_REPO = "legnaro72/Locandine2Word"
 if 'github_manager' not in st.session_state and GITHUB_TOKEN:
     st.session_state.github_manager = GithubManager(GITHUB_TOKEN, GITHUB_REPO)
 
-if 'events' not in st.session_state:
-    st.session_state.events = []
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                content = json.load(f)
-                if isinstance(content, list):
-                    # Normalizzazione percorsi (\ -> /) per compatibilità cloud
-                    for ev in content:
-                        if 'image_path' in ev:
-                            ev['image_path'] = ev['image_path'].replace('\\', '/')
-                    st.session_state.events = content
-        except Exception as e:
-            st.error(f"Errore caricamento database locale: {e}")
+# --- ARCHIVIO EVENTI ---
+# SQLite condiviso dal processo: ogni modifica salva solo l'evento interessato.
+# Al primo avvio importa data.json (percorsi con /, date ISO e id normalizzati una volta sola).
+@st.cache_resource(show_spinner=False)
+def get_event_store():
+    store = EventStore(json_path=DATA_FILE)
+    store.ensure_imported()
+    return store
+
+event_store = get_event_store()
+
+# Elenco eventi condiviso da tutte le sessioni (istantanea in sola lettura, aggiornata
+# copy-on-write a ogni revisione dell'archivio): avviare una sessione non rilegge nulla.
+@st.cache_resource(show_spinner=False)
+def get_event_cache():
+    return EventCache(get_event_store())
+
+event_cache = get_event_cache()
+
+
+def forget_event_widgets(event_id=None):
+    """Scarta i valori dei widget di un evento (o di tutti): verranno riletti dall'evento salvato"""
+    suffix = f"_{event_id}" if event_id else ""
+    for key in [k for k in st.session_state if isinstance(k, str) and k.startswith(EVENT_WIDGET_PREFIXES)]:
+        if key.endswith(suffix):
+            del st.session_state[key]
+
+
+def pending_changes():
+    """Numero di eventi modificati da altre sessioni dopo l'ultima esecuzione (-1: elenco da ricaricare)"""
+    _, changed = event_store.changes_since(st.session_state.event_revision)
+    if changed is None:
+        return -1
+    # Le modifiche salvate da questa sessione sono già visibili (save_event aggiorna ver_<id>)
+    return sum(1 for event_id in changed
+               if event_store.version(event_id) != st.session_state.get(f"ver_{event_id}", 0))
+
+
+def remember_loaded_form(event):
+    """Registra versione e valori con cui l'editor dell'evento è (ri)caricato"""
+    st.session_state[f"ver_{event['id']}"] = event.get('version')
+    st.session_state[f"form_{event['id']}"] = {field: event.get(field, '') for field in EDITOR_FIELDS}
+
+
+def save_event(event):
+    """
+    Salva la copia modificata di un evento (solo quella riga). Se nel frattempo un'altra
+    sessione lo ha salvato non sovrascrive: l'editor mostra il conflitto e tiene le modifiche.
+    Dopo il salvataggio l'editor riparte dalla nuova versione (non è un conflitto).
+    """
+    try:
+        event_store.upsert(event)
+    except ConflictError:
+        st.toast("⚠️ Evento salvato da un'altra sessione: le tue modifiche NON sono state salvate.")
+        return False
+    remember_loaded_form(event)
+    return True
+
+
+# Istantanea degli eventi con indici in memoria (per id, immagine, data, luogo) per questa
+# esecuzione: non va modificata, gli eventi si cambiano salvandone una copia nell'archivio
+try:
+    event_index = event_cache.snapshot()
+except Exception as e:
+    event_index = EventIndex()
+    st.error(f"Errore caricamento database locale: {e}")
+previous_revision = st.session_state.get('event_revision')
+if previous_revision is not None and previous_revision != event_index.revision:
+    if event_store.changes_since(previous_revision)[1] is None:
+        forget_event_widgets()  # Archivio ripristinato: i campi ripartono tutti dai valori salvati
+st.session_state.event_revision = event_index.revision or 0
+
 
+# --- LOCANDINE CARICATE ---
+# Salvate una volta sola per contenuto (nome file = hash): i rerun non riscrivono nulla
+@st.cache_resource(show_spinner=False)
+def get_upload_store():
+    return UploadStore(UPLOADS_DIR)
+
+upload_store = get_upload_store()
+
+
+def stored_upload(uploaded_file):
+    """
+    Locandina caricata, salvata nell'archivio per contenuto. Il risultato è memorizzato
+    nella sessione per ogni file caricato: ai rerun non si rilegge né si scrive nulla.
+    """
+    memo = st.session_state.setdefault('stored_uploads', {})
+    key = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    if key not in memo:
+        memo[key] = upload_store.put(uploaded_file.name, uploaded_file.getbuffer())
+    return memo[key]
+
+
+# --- MOTORE OCR CONDIVISO ---
+# Un solo motore (e un solo set di modelli EasyOCR) per tutto il processo server:
+# il caricamento parte in background alla prima esecuzione e non blocca la pagina.
+@st.cache_resource(show_spinner=False)
+def get_ocr_engine():
+    engine = LocandineOCR()
+    if engine.client is None:
+        warm_up_shared_reader()  # Con il servizio OCR esterno i modelli non si caricano qui
+    return engine
+
+ocr_engine = get_ocr_engine()
+
+# Coda dei job OCR in background (condivisa dal processo, i job restano tra un rerun e l'altro)
+@st.cache_resource(show_spinner=False)
+def get_ocr_jobs():
+    return OCRJobQueue(get_ocr_engine())
+
+ocr_jobs = get_ocr_jobs()
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'ocr_jobs' not in st.session_state:
+    st.session_state.ocr_jobs = {}  # indice file caricato -> id job
+
+
+@st.cache_data(show_spinner=False, max_entries=500)
+def load_thumbnail(image_path, mtime, width=THUMB_WIDTH):
+    """
+    Miniatura JPEG della locandina (la chiave include il mtime: un file sostituito
+    viene rigenerato). Evita di decodificare e inviare l'immagine a piena risoluzione
+    a ogni rerun.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((width, width * 2))
+        buffer = io.BytesIO()
+        img.convert('RGB').save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def filter_events(index, status, date_range, today_iso):
+    """Eventi del Tab 2 in ordine cronologico, filtrati per intervallo di date e stato (campi precalcolati)"""
+    if date_range:
+        events = index.between(date_range[0].isoformat(), date_range[1].isoformat())
+    else:
+        events = index.sorted_by_date()
+    if status == "🆕 Nuovi":
+        return [ev for ev in events if ev.is_new]
+    if status == "📅 In programma":
+        return [ev for ev in events if ev.day_iso >= today_iso]
+    if status == "🚫 Scaduti":
+        return [ev for ev in events if ev.day_iso and ev.day_iso < today_iso]
+    if status == "👯 Duplicati":
+        return [ev for ev in events if index.is_duplicate(ev)]
+    if status == "❓ Senza data":
+        return [ev for ev in events if ev.day is None]
+    return events
+
+
+def ocr_result_to_form(raw_ocr, file_name):
+    """Converte il risultato di analyze_poster nei dati del form di verifica"""
+    raw_text = raw_ocr.get('full_text', '')
+    parsed = parse_event_text(raw_text)
+    parsed['ocr_path'] = raw_ocr.get('ocr_path', 'full')
+    parsed['ocr'] = make_ocr_record(raw_text, raw_ocr.get('boxes'), parsed)
+    # Forza separatore /
+    parsed['image_path'] = f"{UPLOADS_DIR}/{file_name}"
+    return parsed
+
+
+@st.fragment(run_every=2)
+def ocr_jobs_panel():
+    """Stato dei job OCR della sessione; si aggiorna da solo senza rieseguire l'intera app"""
+    jobs = [ocr_jobs.get(job_id) for job_id in st.session_state.ocr_jobs.values()]
+    jobs = [job for job in jobs if job is not None]
+    if jobs:
+        st.markdown("##### 🗂️ Analisi OCR in background")
+        st.dataframe([job.as_row() for job in jobs], hide_index=True)
+
+    ready = False
+    for idx, job_id in list(st.session_state.ocr_jobs.items()):
+        job = ocr_jobs.get(job_id)
+        if job is None:
+            del st.session_state.ocr_jobs[idx]
+        elif job.finished:
+            # Job ritirato in entrambi i casi: senza job in corso il fragment smette di aggiornarsi
+            if job.status == JOB_DONE:
+                st.session_state[f'temp_data_{idx}'] = ocr_result_to_form(job.result, os.path.basename(job.image_path))
+            else:
+                st.session_state[f'ocr_error_{idx}'] = job.error  # Mostrato sotto il file fino al nuovo tentativo
+            ocr_jobs.discard(job_id)
+            del st.session_state.ocr_jobs[idx]
+            ready = True
+    if ready:
+        st.rerun()  # Rerun completo: mostra i form di verifica (o gli errori) dei job conclusi
+
+@st.fragment
+def event_editor(event_id):
+    """
+    Editor di un singolo evento (Tab 2) con la sua dettatura vocale. È un fragment:
+    modifiche, dettatura e "Rimuovi Etichetta" salvano e ridisegnano solo questo evento,
+    senza rieseguire l'intera app. Il rerun completo avviene solo se cambia l'elenco
+    (eliminazione).
+    """
+    event_index = event_cache.snapshot()
+    event = event_index.get(event_id)
+    if event is None:
+        return
+    # ver_<id>: versione su cui è stato caricato il modulo, usata per salvare (conflitti).
+    # Se l'evento è stato salvato in una nuova versione (qui o altrove) i campi ripartono dai
+    # valori salvati, a meno che contengano modifiche non salvate: allora si segnala il conflitto.
+    ver_key = f"ver_{event_id}"
+    form_key = f"form_{event_id}"
+    loaded = st.session_state.get(form_key)
+    form = {field: st.session_state[f"{prefix}{event_id}"] for field, prefix in EDITOR_FIELDS.items()
+            if f"{prefix}{event_id}" in st.session_state}
+    unsaved = edited_fields(loaded, form) if loaded is not None else []
+    if loaded is None or (st.session_state.get(ver_key) != event.get('version') and not unsaved):
+        forget_event_widgets(event_id)
+        remember_loaded_form(event)
+    stale = st.session_state[ver_key] != event.get('version')
+
+    # Scadenza e duplicati dai campi precalcolati dell'Event (anche immagini solo simili)
+    similar = event_index.near_duplicates(event.phash_value, exclude=[event_id])
+    dup_icon = "👯 " if similar or event_index.is_duplicate(event) else ""
+    exp_icon = "🚫 EXPIRED " if event.is_expired(datetime.now().date()) else ""
+    # Copia modificabile (l'istantanea condivisa resta intatta) con la versione del modulo
+    saved = event
+    event = editable_copy(event, st.session_state[ver_key])
+    title_prefix = f"{dup_icon}{exp_icon}🆕 " if event.get('is_new') else f"{dup_icon}{exp_icon}"
+
+    # Dopo una modifica l'etichetta cambia: l'expander resta aperto esplicitamente
+    open_key = f"open_{event_id}"
+    with st.expander(f"{title_prefix}📅 {event.get('title', 'Titolo n/d')}",
+                     expanded=stale or st.session_state.get(open_key, False)):
+
+        if stale:
+            st.warning("⚠️ Evento salvato da un'altra sessione dopo l'apertura: le tue modifiche "
+                       f"({', '.join(EDITOR_LABELS[f] for f in unsaved)}) non sono state salvate. "
+                       "\"Aggiorna\" non sovrascrive la versione dell'altra sessione.")
+            for field in EDITOR_FIELDS:
+                if saved.get(field, '') != loaded.get(field, ''):
+                    st.caption(f"{EDITOR_LABELS[field]} salvato: {saved.get(field, '')}")
+            if st.button("↩️ Scarta le mie modifiche e carica la versione salvata", key=f"reload_{event_id}"):
+                forget_event_widgets(event_id)
+                st.rerun(scope="fragment")
+
+        if similar:
+            st.caption("🪞 Locandine simili: " + ", ".join(
+                f"{ev.get('title', 'Senza Titolo')} ({distance} bit diversi)" for distance, ev in similar[:5]))
+
+        # ===== INIZIALIZZAZIONE WIDGET STATE SICURA =====
+        def init_widget(key, default):
+            if key not in st.session_state:
+                st.session_state[key] = default
+
+        k_tit = f"e_tit_{event_id}"
+        k_dat = f"e_dat_{event_id}"
+        k_tim = f"e_tim_{event_id}"
+        k_loc = f"e_loc_{event_id}"
+        k_ven = f"e_ven_{event_id}"
+        k_add = f"e_add_{event_id}"
+        k_des = f"e_des_{event_id}"
+
+        init_widget(k_tit, event.get('title', ''))
+        init_widget(k_dat, event.get('date', ''))
+        init_widget(k_tim, event.get('time', ''))
+        init_widget(k_loc, event.get('location', ''))
+        init_widget(k_ven, event.get('venue', ''))
+        init_widget(k_add, event.get('address', ''))
+        init_widget(k_des, event.get('description', ''))
+
+
+        # ===== DETTATURA =====
+        if speech_to_text:
+            st.markdown("#### 🎤 Dettatura Vocale")
+
+            sel_key = f"sel_field_{event_id}"
+            mic_buffer_key = f"mic_buffer_{event_id}"
+
+            # Selettore campo
+            st.selectbox(
+                "Campo da compilare con la voce",
+                options=['description', 'title', 'location', 'venue', 'address', 'date', 'time'],
+                key=sel_key
+            )
+
+            # Microfono salva SOLO in buffer
+            text_dettato = speech_to_text(
+                language='it',
+                start_prompt="🔴 PARLA",
+                stop_prompt="⏹️ STOP",
+                just_once=True,
+                key=f"stt_widget_{event_id}"
+            )
+
+            if text_dettato:
+                st.session_state[mic_buffer_key] = text_dettato
+
+            # Se c'è testo nel buffer lo mostriamo
+            if mic_buffer_key in st.session_state:
+                st.info(f"Testo rilevato: {st.session_state[mic_buffer_key]}")
+
+                if st.button("✅ Inserisci nel campo selezionato", key=f"apply_mic_{event_id}"):
+
+                    final_field = st.session_state.get(sel_key, "description")
+
+                    mapping = {
+                        'title': k_tit,
+                        'date': k_dat,
+                        'time': k_tim,
+                        'location': k_loc,
+                        'venue': k_ven,
+                        'address': k_add,
+                        'description': k_des
+                    }
+
+                    widget_k = mapping.get(final_field)
+
+                    if widget_k:
+                        st.session_state[widget_k] = st.session_state[mic_buffer_key]
+                        event[final_field] = st.session_state[mic_buffer_key]
+                        if final_field == 'date':
+                            refresh_date_iso(event)
+
+                        del st.session_state[mic_buffer_key]
+                        if save_event(event):
+                            st.toast("Campo aggiornato!")
+                        st.session_state[open_key] = True
+                        st.rerun(scope="fragment")
+
+
+        st.divider()
+
+        c1, c2 = st.columns([1, 2])
+        ###
+        # Normalizzazione cross-platform
+        image_path = os.path.normpath(event.get('image_path', ''))
+
+        if image_path and os.path.exists(image_path):
+            try:
+                c1.image(load_thumbnail(image_path, os.path.getmtime(image_path)), **IMG_WIDTH_ARG)
+            except Exception:
+                c1.image(image_path, **IMG_WIDTH_ARG)  # Formato non gestito da PIL: immagine originale
+        else:
+            c1.error(f"Immagine non trovata: {image_path}")
+
+
+        with c2:
+            st.markdown("### Modifica Dettagli")
+
+            n_title = st.text_input("Titolo", key=k_tit)
+            r1, r2 = st.columns(2)
+            n_date = r1.text_input("Data", key=k_dat)
+            n_time = r2.text_input("Orario", key=k_tim)
+
+            r3, r4 = st.columns(2)
+            n_loc = r3.text_input("Luogo", key=k_loc)
+            n_venue = r4.text_input("Presso", key=k_ven)
+
+            n_addr = st.text_input("Indirizzo", key=k_add)
+            n_desc = st.text_area("Descrizione", key=k_des, height=100)
+
+            col_b1, col_b2, col_b3 = st.columns([1, 1, 1])
+
+            if col_b1.button("💾 Aggiorna", key=f"upd_{event_id}"):
+                event.update({
+                    'title': n_title,
+                    'date': n_date,
+                    'time': n_time,
+                    'location': n_loc,
+                    'venue': n_venue,
+                    'address': n_addr,
+                    'description': n_desc
+                })
+                refresh_date_iso(event)
+                if save_event(event):
+                    st.toast("Aggiornato!")
+                st.session_state[open_key] = True
+                st.rerun(scope="fragment")
+
+            # Pulsante RIMUOVI NEW (visibile solo se l'evento è nuovo)
+            if event.get('is_new'):
+                if col_b2.button("🚫 Rimuovi Etichetta", key=f"unew_{event_id}", help="Rimuove l'etichetta NEW da questo evento"):
+                    event['is_new'] = False
+                    save_event(event)
+                    st.session_state[open_key] = True
+                    st.rerun(scope="fragment")
+            else:
+                 col_b2.write("") # Spacer se non c'è il pulsante
+
+            if col_b3.button("🗑️ Elimina", key=f"del_{event_id}", type="primary"):
+                try:
+                    event_store.delete(event_id, version=event.get('version'))
+                except ConflictError:
+                    # Modificato altrove nel frattempo: non si elimina, si mostra la versione salvata
+                    st.toast("⚠️ Evento modificato da un'altra sessione: eliminazione annullata.")
+                    st.rerun(scope="fragment")
+                st.rerun()  # L'elenco cambia: rerun completo
+
+
+@st.fragment(run_every=SYNC_INTERVAL)
+def sync_notice():
+    """Avviso, controllato periodicamente, degli eventi salvati da altre sessioni"""
+    pending = pending_changes()
+    if pending:
+        text = "Archivio riordinato o ripristinato" if pending < 0 else f"{pending} eventi modificati"
+        col_n1, col_n2 = st.columns([3, 1])
+        col_n1.info(f"🔔 {text} da un'altra sessione.")
+        if col_n2.button("🔄 Aggiorna elenco", key="sync_reload"):
+            st.rerun()  # Il rerun completo legge la nuova istantanea condivisa
 
-if 'ocr_engine' not in st.session_state:
-    st.session_state.ocr_engine = LocandineOCR()
 
 # --- UI PRINCIPALE ---
 st.markdown('<h1 class="main-header">🎭 Locandine2Word</h1>', unsafe_allow_html=True)
 
 with st.sidebar:
     st.header("⚙️ Opzioni")
+
+    ocr_status = shared_reader_status()
+    if ocr_engine.client is not None:
+        st.success(f"🟢 Servizio OCR: {ocr_engine.client.address}")
+    elif ocr_status == 'ready':
+        st.success(f"🟢 Motore OCR pronto (backend: {ocr_engine.effective_backend})")
+    elif ocr_status == 'error':
+        st.error("🔴 Errore caricamento motore OCR")
+    else:
+        st.info("⏳ Motore OCR in caricamento...")
+
     doc_name = st.text_input("Nome file Word", "Eventi.docx")
     st.divider()
     
@@ -174,6 +512,7 @@ with st.sidebar:
     if st.button("📦 Crea Backup (.zip)"):
         with st.spinner("Creazione archivio in corso..."):
             try:
+                event_store.export_json()  # data.json aggiornato con l'archivio
                 # Creazione ZIP in memoria
                 zip_buffer = io.BytesIO()
                 with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
@@ -221,6 +560,7 @@ with st.sidebar:
         if col_c1.button("✅ Sì, Invia", key="confirm_push_btn"):
             with st.spinner("Sincronizzazione con GitHub in corso..."):
                 try:
+                    event_store.export_json()
                     zip_data = st.session_state.github_manager.create_backup_zip(DATA_FILE, UPLOADS_DIR)
                     success, msg = st.session_state.github_manager.upload_backup(zip_data)
                     if success:
@@ -247,10 +587,9 @@ with st.sidebar:
                 try:
                     zip_content = st.session_state.github_manager.download_backup()
                     st.session_state.github_manager.restore_from_zip(zip_content)
+                    event_store.import_json()
                     st.success("Dati ripristinati da GitHub correttamente! Ricarico...")
-                    # Rimuoviamo la chiave per forzare la rilettura dal nuovo data.json su disco al rerun
-                    if 'events' in st.session_state:
-                        del st.session_state['events']
+                    # L'archivio sostituito cambia revisione: al rerun tutte le sessioni rileggono l'elenco
                     st.session_state.show_confirm_pull = False
                     st.rerun()
                 except Exception as e:
@@ -273,10 +612,9 @@ with st.sidebar:
                     with zipfile.ZipFile(uploaded_backup) as z:
                         # Estrai tutto nella cartella corrente (sovrascrive data.json e uploads/)
                         z.extractall(".")
+                    if os.path.exists(DATA_FILE):
+                        event_store.import_json()
                     
-                    # Forza ricaricamento totale
-                    if 'events' in st.session_state:
-                        del st.session_state['events']
                     st.success("Backup ripristinato con successo! Ricarico...")
                     st.rerun()
 
@@ -284,16 +622,10 @@ with st.sidebar:
                 elif uploaded_backup.name.endswith('.json'):
                     new_data = json.load(uploaded_backup)
                     if isinstance(new_data, list):
-                        count = 0
-                        for entry in new_data:
-                            # Logica importazione
-                            if 'title' in entry: # Già processato
-                                st.session_state.events.append(entry)
-                                count += 1
-                        
-                        # Salva unione
-                        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                            json.dump(st.session_state.events, f, ensure_ascii=False, indent=2)
+                        # Logica importazione: solo eventi già processati
+                        imported = [refresh_date_iso(entry) for entry in new_data if 'title' in entry]
+                        count = len(imported)
+                        event_store.upsert_many(imported, force=True)
                         st.success(f"Aggiunti {count} eventi dal JSON.")
                         st.rerun()
 
@@ -302,9 +634,8 @@ with st.sidebar:
 
     st.divider()
     if st.button("🗑️ Reset Database Completo"):
-        with open(DATA_FILE, 'w', encoding='utf-8') as f: json.dump([], f)
-        if 'events' in st.session_state:
-            del st.session_state['events']
+        event_store.replace_all([])
+        event_store.export_json()
         st.rerun()
 
 tab1, tab2, tab3 = st.tabs(["📤 Carica & Analizza", "📋 Modifica Dati", "📖 Export Word"])
@@ -338,22 +669,82 @@ with tab1:
             st.error(f"Errore lettura JSON: {e}")
 
     uploaded_files = st.file_uploader("Trascina qui le immagini", type=['png', 'jpg', 'jpeg'], accept_multiple_files=True)
+    roi_first = st.checkbox("⚡ OCR rapido (prima solo intestazione e didascalia)", value=False,
+                            help="Legge prima le fasce alta e bassa della locandina e si ferma se trova data e orario; "
+                                 "altrimenti completa la lettura dell'intera pagina.")
     
     if uploaded_files:
+        stored = [stored_upload(f) for f in uploaded_files]
+        # Primo file caricato con ogni contenuto: gli altri identici non vanno analizzati di nuovo
+        first_upload = {}
+        for idx, record in enumerate(stored):
+            first_upload.setdefault(record['hash'], idx)
+
+        # --- ANALISI IN BLOCCO ---
+        # Locandine ancora da analizzare: senza dati JSON e senza form di verifica già pronto
+        pending = [
+            (idx, f) for idx, f in enumerate(uploaded_files)
+            if f'temp_data_{idx}' not in st.session_state and f.name not in prefill_map
+            and idx not in st.session_state.ocr_jobs and first_upload[stored[idx]['hash']] == idx
+        ]
+        if len(pending) > 1:
+            col_bt1, col_bt2 = st.columns([1, 2])
+            n_workers = col_bt1.number_input("Processi paralleli", min_value=1, max_value=os.cpu_count() or 1,
+                                             value=min(DEFAULT_WORKERS, len(pending)))
+            col_bt2.write("")
+            if col_bt2.button(f"⚡ Analizza tutte le {len(pending)} locandine in attesa (OCR)"):
+                paths = {stored[idx]['path']: (idx, uploaded_file.name) for idx, uploaded_file in pending}
+
+                progress = st.progress(0.0, text="Avvio processi OCR...")
+                errors = []
+                for done, (path, raw_ocr, error) in enumerate(
+                        iter_analyze_posters(list(paths), workers=int(n_workers), roi_first=roi_first), start=1):
+                    idx, name = paths[path]
+                    if error:
+                        errors.append(f"{name}: {error}")
+                    else:
+                        st.session_state[f'temp_data_{idx}'] = ocr_result_to_form(raw_ocr, os.path.basename(path))
+                        st.session_state.pop(f'ocr_error_{idx}', None)
+                    progress.progress(done / len(paths), text=f"Analizzate {done}/{len(paths)}: {name}")
+
+                if errors:
+                    st.error("Errori OCR:\n\n" + "\n\n".join(errors))
+                else:
+                    st.rerun()  # Mostra subito tutti i form di verifica
+
+        if st.session_state.ocr_jobs:
+            ocr_jobs_panel()
+
         for idx, uploaded_file in enumerate(uploaded_files):
             with st.expander(f"🖼️ {uploaded_file.name}", expanded=True):
                 col1, col2 = st.columns([1, 2])
                 
-                # Salvataggio e Anteprima Immagine
-                image_path = os.path.join(UPLOADS_DIR, uploaded_file.name)
-                # Salva solo se non esiste o aggiorna? Meglio sovrascrivere per sicurezza
-                with open(image_path, 'wb') as f:
-                    f.write(uploaded_file.getbuffer())
+                # Immagine già salvata per contenuto (stored_upload)
+                record = stored[idx]
+                image_path = record['path']
+                # Job OCR in corso per questo file
+                job = ocr_jobs.get(st.session_state.ocr_jobs.get(idx, ''))
                 
                 # Visualizza immagine
                 col1.image(image_path, **IMG_WIDTH_ARG)
                 
                 with col2:
+                    # Stessa immagine (byte per byte) già in archivio o caricata sopra
+                    same_content = event_index.by_hash(record['hash'])
+                    if same_content:
+                        titles = ", ".join(ev.get('title', 'Senza Titolo') for ev in same_content)
+                        st.warning(f"👯 Locandina già in archivio (stesso contenuto): {titles}")
+                    elif first_upload[record['hash']] != idx:
+                        st.warning(f"👯 Stesso contenuto di '{uploaded_files[first_upload[record['hash']]].name}', "
+                                   f"caricato sopra.")
+                    else:
+                        # Stessa locandina ricompressa o come screenshot (hash percettivo)
+                        similar = event_index.near_duplicates(record.get('phash'))
+                        if similar:
+                            st.warning("🪞 Locandina simile già in archivio: " + ", ".join(
+                                f"{ev.get('title', 'Senza Titolo')} ({distance} bit diversi)"
+                                for distance, ev in similar[:5]))
+
                     # Check match JSON
                     json_match = prefill_map.get(uploaded_file.name)
                     
@@ -363,10 +754,16 @@ with tab1:
                     else:
                         btn_label = "🔍 Estrai Dati (OCR)"
 
-                    # Pulsante Elaborazione
-                    if st.button(btn_label, key=f"proc_{idx}"):
-                        with st.spinner("Elaborazione..."):
-                            
+                    if job is not None and not job.finished:
+                        st.info(f"{JOB_STATUS_LABELS[job.status]}... puoi continuare a lavorare negli altri tab.")
+                    else:
+                        ocr_error = st.session_state.get(f'ocr_error_{idx}')
+                        if ocr_error is not None:
+                            st.error(f"Errore OCR: {ocr_error}")
+
+                        # Pulsante Elaborazione
+                        if st.button(btn_label, key=f"proc_{idx}"):
+                            st.session_state.pop(f'ocr_error_{idx}', None)  # Nuovo tentativo
                             if json_match:
                                 # USA DATI JSON
                                 parsed = {
@@ -378,24 +775,26 @@ with tab1:
                                     'address': json_match.get('address', ''),
                                     'description': json_match.get('description', '')
                                 }
+                                parsed['image_path'] = image_path  # Già con separatore /
+
+                                # Salva in temp per mostrare il form
+                                st.session_state[f'temp_data_{idx}'] = parsed
                             else:
-                                # USA OCR
-                                raw_ocr = st.session_state.ocr_engine.analyze_poster(image_path)
-                                raw_text = raw_ocr.get('full_text', '')
-                                parsed = parse_event_text(raw_text)
-                            
-                            # Forza separatore /
-                            parsed['image_path'] = f"{UPLOADS_DIR}/{uploaded_file.name}"
-                            
-                            # Salva in temp per mostrare il form
-                            st.session_state[f'temp_data_{idx}'] = parsed
-                            st.rerun() # Refresh per mostrare il form sotto
+                                # USA OCR: job in background, il risultato arriva nel form quando pronto
+                                if job is not None:
+                                    ocr_jobs.discard(job.id)
+                                st.session_state.ocr_jobs[idx] = ocr_jobs.submit(
+                                    image_path, st.session_state.session_id, uploaded_file.name, roi_first=roi_first
+                                )
+                            st.rerun() # Refresh per mostrare il form (o lo stato del job) sotto
 
                     # Form di Verifica (appare SOLO se abbiamo i dati in temp)
                     if f'temp_data_{idx}' in st.session_state:
                         data = st.session_state[f'temp_data_{idx}']
                         st.markdown("---")
                         st.markdown("#### ✏️ Verifica e Salva")
+                        if data.get('ocr_path'):
+                            st.caption(f"Percorso OCR: {OCR_PATH_LABELS.get(data['ocr_path'], data['ocr_path'])}")
                         
                         with st.form(key=f"save_form_{idx}"):
                             # Titolo
@@ -422,10 +821,14 @@ with tab1:
                                     'added_on': datetime.now().strftime('%Y-%m-%d'),
                                     'is_new': True
                                 }
-                                st.session_state.events.append(new_event)
-                                # Salva su disco
-                                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                                    json.dump(st.session_state.events, f, ensure_ascii=False, indent=2)
+                                if data.get('ocr'):
+                                    # Testo e box OCR grezzi: permettono di ri-analizzare senza rifare l'OCR
+                                    new_event['ocr'] = data['ocr']
+                                if record.get('phash'):
+                                    new_event['phash'] = record['phash']  # Calcolato al caricamento
+                                refresh_date_iso(new_event)
+                                # Salva su disco (solo il nuovo evento)
+                                event_store.upsert(new_event)
                                 
                                 st.success("Evento salvato correttamente! Vai al Tab 'Modifica Dati' per vederlo.")
                                 # Pulisce lo stato temp
@@ -435,9 +838,10 @@ with tab1:
 # --- TAB 2: GESTIONE ---
 with tab2:
     st.subheader("Gestione Eventi Salvati")
+    sync_notice()
     
     # Recupero sicuro degli eventi
-    events_list = st.session_state.get('events', [])
+    events_list = event_index.events()
     
     if not events_list:
         st.info("Nessun evento in archivio.")
@@ -446,48 +850,57 @@ with tab2:
         total_ev = len(events_list)
         st.write(f"📊 Totale Eventi in Archivio: **{total_ev}**")
 
-        # Controllo Duplicati (Basato esclusivamente sul Percorso Immagine)
-        image_counts = {}
-        for ev in events_list:
-            img_path = ev.get('image_path', '').strip()
-            if img_path:
-                image_counts[img_path] = image_counts.get(img_path, 0) + 1
-        
-        # Percorsi che appaiono più di una volta
-        duplicate_paths = {path for path, count in image_counts.items() if count > 1}
+        # Controllo Duplicati (stesso percorso o stesso contenuto dell'immagine, dagli indici)
+        duplicate_images = event_index.duplicate_images()
         
-        if duplicate_paths:
-            total_dup_events = sum(image_counts[p] for p in duplicate_paths)
-            st.error(f"🚨 ALERT: Trovate **{len(duplicate_paths)}** immagini usate in più eventi (totale **{total_dup_events}** eventi duplicati)!")
+        if duplicate_images:
+            total_dup_events = sum(len(evs) for evs in duplicate_images.values())
+            st.error(f"🚨 ALERT: Trovate **{len(duplicate_images)}** immagini usate in più eventi (totale **{total_dup_events}** eventi duplicati)!")
             with st.expander("📖 Legenda Duplicati Immagine"):
-                for path in duplicate_paths:
-                    titles = [ev.get('title', 'Senza Titolo') for ev in events_list if ev.get('image_path', '').strip() == path]
+                for path, dup_events in duplicate_images.items():
                     st.write(f"🖼️ `{path}`")
-                    for t in titles:
-                        st.write(f"  - {t}")
+                    for ev in dup_events:
+                        st.write(f"  - {ev.get('title', 'Senza Titolo')}")
         else:
             st.success("✅ Nessun duplicato di immagine rilevato.")
 
         col_m1, col_m2, col_m3 = st.columns([2, 1, 1])
+
+        with col_m1:
+            n_stale = sum(1 for ev in events_list if is_stale(ev))
+            if st.button(f"♻️ Ri-analizza testi OCR ({n_stale} da aggiornare)", disabled=not n_stale,
+                         help="Ri-estrae i campi dal testo OCR salvato con la versione corrente del parser, "
+                              "senza rifare l'OCR e senza toccare i campi corretti a mano."):
+                stale = [copy.deepcopy(ev.to_dict()) for ev in events_list if is_stale(ev)]  # L'elenco è condiviso
+                summary = reparse_events(stale)
+                try:
+                    event_store.upsert_many(stale)
+                except ConflictError as e:
+                    st.error(f"{e}. Nessun evento salvato: riprova con l'elenco aggiornato.")
+                else:
+                    st.success(f"Ri-analizzati {summary['reparsed']} eventi, aggiornati {summary['updated']} "
+                               f"({summary['fields']} campi).")
+                    st.rerun()
         
         with col_m2:
             if st.button("🏷️ Rinomina Auto"):
-                import dateparser
                 import locale
                 try:
                     locale.setlocale(locale.LC_TIME, 'it_IT.utf8')
                 except:
                     pass
 
+                events_list = [ev.to_dict() for ev in events_list]  # Copie: l'elenco è condiviso
                 for event in events_list:
                     raw_date = event.get('date', '').strip()
                     location = event.get('location', '').strip()
                     
                     if raw_date:
-                        dt = dateparser.parse(raw_date, languages=['it'])
+                        dt = parse_italian_date(raw_date)
                         if dt:
                             clean_date = dt.strftime("%d %B %Y").upper()
                             event['date'] = clean_date
+                            event['date_iso'] = dt.isoformat()
                             
                             day_map_safe = {
                                 0: "LUNEDI'", 1: "MARTEDI'", 2: "MERCOLEDI'", 
@@ -498,190 +911,65 @@ with tab2:
                             
                             event['title'] = f"{full_date_string} - {location}" if location else full_date_string
                 
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(events_list, f, ensure_ascii=False, indent=2)
-                st.success("Date pulite e Titoli rinominati!")
-                st.rerun()
+                try:
+                    event_store.upsert_many(events_list)
+                except ConflictError as e:
+                    st.error(f"{e}. Nessun evento salvato: riprova con l'elenco aggiornato.")
+                else:
+                    st.success("Date pulite e Titoli rinominati!")
+                    st.rerun()
 
         with col_m3:
             if st.button("🔄 Riordina Date"):
-                events_list.sort(key=WordGenerator.get_sort_date)
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(events_list, f, ensure_ascii=False, indent=2)
+                event_store.reorder([ev['id'] for ev in event_index.sorted_by_date()])
                 st.success("Eventi riordinati!")
                 st.rerun()
 
-        indexed_events = list(enumerate(events_list))
-        sorted_indexed_events = sorted(
-            indexed_events, 
-            key=lambda x: WordGenerator.get_sort_date(x[1])
-        )
-
         st.info("ℹ️ Gli eventi sono ordinati cronologicamente.")
 
-        # -------- LOOP EVENTI --------
+        # -------- FILTRI E PAGINAZIONE --------
+        # Si costruiscono widget e immagini solo per gli eventi della pagina visibile
         now = datetime.now()
-        for real_idx, event in sorted_indexed_events:
-            # Calcolo scadenza
-            is_expired = False
-            ev_date = WordGenerator.get_sort_date(event)
-            if ev_date != datetime.max and ev_date.date() < now.date():
-                is_expired = True
-
-            dup_icon = "👯 " if event.get('image_path', '').strip() in duplicate_paths else ""
-            exp_icon = "🚫 EXPIRED " if is_expired else ""
-            title_prefix = f"{dup_icon}{exp_icon}🆕 " if event.get('is_new') else f"{dup_icon}{exp_icon}"
-            
-            with st.expander(f"{title_prefix}📅 {event.get('title', 'Titolo n/d')}"):
-
-                # ===== INIZIALIZZAZIONE WIDGET STATE SICURA =====
-                def init_widget(key, default):
-                    if key not in st.session_state:
-                        st.session_state[key] = default
-
-                k_tit = f"e_tit_{real_idx}"
-                k_dat = f"e_dat_{real_idx}"
-                k_tim = f"e_tim_{real_idx}"
-                k_loc = f"e_loc_{real_idx}"
-                k_ven = f"e_ven_{real_idx}"
-                k_add = f"e_add_{real_idx}"
-                k_des = f"e_des_{real_idx}"
-
-                init_widget(k_tit, event.get('title', ''))
-                init_widget(k_dat, event.get('date', ''))
-                init_widget(k_tim, event.get('time', ''))
-                init_widget(k_loc, event.get('location', ''))
-                init_widget(k_ven, event.get('venue', ''))
-                init_widget(k_add, event.get('address', ''))
-                init_widget(k_des, event.get('description', ''))
-
-
-                # ===== DETTATURA =====
-                if speech_to_text:
-                    st.markdown("#### 🎤 Dettatura Vocale")
-
-                    sel_key = f"sel_field_{real_idx}"
-                    mic_buffer_key = f"mic_buffer_{real_idx}"
-
-                    # Selettore campo
-                    st.selectbox(
-                        "Campo da compilare con la voce",
-                        options=['description', 'title', 'location', 'venue', 'address', 'date', 'time'],
-                        key=sel_key
-                    )
-
-                    # Microfono salva SOLO in buffer
-                    text_dettato = speech_to_text(
-                        language='it',
-                        start_prompt="🔴 PARLA",
-                        stop_prompt="⏹️ STOP",
-                        just_once=True,
-                        key=f"stt_widget_{real_idx}"
-                    )
-
-                    if text_dettato:
-                        st.session_state[mic_buffer_key] = text_dettato
-
-                    # Se c'è testo nel buffer lo mostriamo
-                    if mic_buffer_key in st.session_state:
-                        st.info(f"Testo rilevato: {st.session_state[mic_buffer_key]}")
-
-                        if st.button("✅ Inserisci nel campo selezionato", key=f"apply_mic_{real_idx}"):
-
-                            final_field = st.session_state.get(sel_key, "description")
-
-                            mapping = {
-                                'title': k_tit,
-                                'date': k_dat,
-                                'time': k_tim,
-                                'location': k_loc,
-                                'venue': k_ven,
-                                'address': k_add,
-                                'description': k_des
-                            }
-
-                            widget_k = mapping.get(final_field)
-
-                            if widget_k:
-                                st.session_state[widget_k] = st.session_state[mic_buffer_key]
-                                event[final_field] = st.session_state[mic_buffer_key]
-
-                                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                                    json.dump(events_list, f, ensure_ascii=False, indent=2)
-
-                                del st.session_state[mic_buffer_key]
-                                st.success("Campo aggiornato!")
-                                st.rerun()
-
-
-                st.divider()
-
-                c1, c2 = st.columns([1, 2])
-                ###
-                # Normalizzazione cross-platform
-                image_path = os.path.normpath(event.get('image_path', ''))
-
-                if image_path and os.path.exists(image_path):
-                    c1.image(image_path, **IMG_WIDTH_ARG)
-                else:
-                    c1.error(f"Immagine non trovata: {image_path}")
-
-
-                with c2:
-                    st.markdown("### Modifica Dettagli")
-
-                    n_title = st.text_input("Titolo", key=k_tit)
-                    r1, r2 = st.columns(2)
-                    n_date = r1.text_input("Data", key=k_dat)
-                    n_time = r2.text_input("Orario", key=k_tim)
-
-                    r3, r4 = st.columns(2)
-                    n_loc = r3.text_input("Luogo", key=k_loc)
-                    n_venue = r4.text_input("Presso", key=k_ven)
-
-                    n_addr = st.text_input("Indirizzo", key=k_add)
-                    n_desc = st.text_area("Descrizione", key=k_des, height=100)
-
-                    col_b1, col_b2, col_b3 = st.columns([1, 1, 1])
-
-                    if col_b1.button("💾 Aggiorna", key=f"upd_{real_idx}"):
-                        events_list[real_idx].update({
-                            'title': n_title,
-                            'date': n_date,
-                            'time': n_time,
-                            'location': n_loc,
-                            'venue': n_venue,
-                            'address': n_addr,
-                            'description': n_desc
-                        })
-
-                        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                            json.dump(events_list, f, ensure_ascii=False, indent=2)
-
-                        st.success("Aggiornato!")
-                        st.rerun()
-
-                    # Pulsante RIMUOVI NEW (visibile solo se l'evento è nuovo)
-                    if event.get('is_new'):
-                        if col_b2.button("🚫 Rimuovi Etichetta", key=f"unew_{real_idx}", help="Rimuove l'etichetta NEW da questo evento"):
-                            events_list[real_idx]['is_new'] = False
-                            with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                                json.dump(events_list, f, ensure_ascii=False, indent=2)
-                            st.rerun()
-                    else:
-                         col_b2.write("") # Spacer se non c'è il pulsante
+        col_f1, col_f2, col_f3 = st.columns([2, 2, 1])
+        status_filter = col_f1.selectbox("Stato", STATUS_FILTERS, key="flt_status")
+        date_range = None
+        use_dates = col_f2.checkbox("Filtra per data", key="flt_use_dates")
+        if use_dates:
+            picked = col_f2.date_input("Intervallo date", value=(now.date(), now.date()), key="flt_dates",
+                                       format="DD/MM/YYYY")
+            if isinstance(picked, (list, tuple)) and len(picked) == 2:
+                date_range = tuple(picked)
+        page_size = col_f3.selectbox("Per pagina", PAGE_SIZES, key="flt_page_size")
+
+        visible_events = filter_events(event_index, status_filter, date_range, now.date().isoformat())
+        n_pages = max(1, -(-len(visible_events) // page_size))
+
+        # Cambiando i filtri si torna alla prima pagina
+        filter_signature = (status_filter, date_range, page_size)
+        if st.session_state.get('flt_signature') != filter_signature:
+            st.session_state.flt_signature = filter_signature
+            st.session_state.flt_page = 1
+        st.session_state.flt_page = min(st.session_state.get('flt_page', 1), n_pages)
+
+        col_p1, col_p2 = st.columns([1, 3])
+        page = col_p1.number_input("Pagina", min_value=1, max_value=n_pages, key="flt_page")
+        start = (page - 1) * page_size
+        page_events = visible_events[start:start + page_size]
+        if page_events:
+            col_p2.caption(f"Eventi {start + 1}–{start + len(page_events)} di {len(visible_events)} "
+                           f"(pagina {page} di {n_pages})")
+        else:
+            col_p2.caption("Nessun evento corrisponde ai filtri.")
 
-                    if col_b3.button("🗑️ Elimina", key=f"del_{real_idx}", type="primary"):
-                        events_list.pop(real_idx)
-                        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                            json.dump(events_list, f, ensure_ascii=False, indent=2)
-                        st.rerun()
+        # -------- LOOP EVENTI --------
+        for event in page_events:
+            event_editor(event['id'])
 
 # --- TAB 3: EXPORT ---
 with tab3:
     st.subheader("Generazione Documento")
     # Usa events_list invece di session_state
-    events_list_exp = st.session_state.get('events', [])
+    events_list_exp = event_index.events()
     st.write(f"Eventi pronti per la stampa: **{len(events_list_exp)}**")
     
     
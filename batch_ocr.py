@@ -0,0 +1,83 @@
+"""
+Analisi OCR in blocco di più locandine tramite un pool di processi
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_WORKERS = int(os.environ.get("LOCANDINE_OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+DEFAULT_TORCH_THREADS = int(os.environ.get("LOCANDINE_OCR_TORCH_THREADS", 1))
+
+# Motore OCR del singolo processo worker (creato dall'initializer)
+_worker_ocr = None
+
+
+def _init_worker(torch_threads: int, use_cache: bool, roi_first: bool = False):
+    """
+    Inizializza il processo worker: limita i thread di torch (altrimenti N processi
+    userebbero ciascuno tutti i core) e carica un reader dedicato (non se l'OCR è
+    affidato al servizio condiviso: allora il worker fa solo da client)
+    """
+    global _worker_ocr
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    from ocr_engine import LocandineOCR, get_shared_reader
+    _worker_ocr = LocandineOCR(use_cache=use_cache, roi_first=roi_first)
+    if _worker_ocr.client is None:
+        get_shared_reader()  # Carica subito i modelli, non alla prima immagine
+
+
+def _analyze_one(image_path: str) -> Tuple[str, Optional[Dict], Optional[str]]:
+    try:
+        return image_path, _worker_ocr.analyze_poster(image_path), None
+    except Exception as e:
+        return image_path, None, str(e)
+
+
+def iter_analyze_posters(image_paths: List[str], workers: int = DEFAULT_WORKERS,
+                         torch_threads: int = DEFAULT_TORCH_THREADS,
+                         use_cache: bool = True, roi_first: bool = False) -> Iterator[Tuple[str, Optional[Dict], Optional[str]]]:
+    """
+    Analizza le locandine in parallelo e restituisce i risultati man mano che sono pronti,
+    come tuple ``(image_path, risultato_analyze_poster, errore)``.
+    Se un processo worker muore (inizializzazione fallita, memoria esaurita) le locandine
+    non ancora analizzate vengono restituite con l'errore, senza interrompere il ciclo.
+    """
+    if not image_paths:
+        return
+    workers = max(1, min(workers, len(image_paths)))
+    # 'spawn' evita di duplicare con fork lo stato di torch e dei thread del server
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker,
+                             initargs=(torch_threads, use_cache, roi_first)) as pool:
+        futures = {pool.submit(_analyze_one, path): path for path in image_paths}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool as e:
+                yield futures[future], None, f"Processo OCR terminato in modo anomalo: {e}"
+
+
+def analyze_posters_batch(image_paths: List[str], workers: int = DEFAULT_WORKERS,
+                          torch_threads: int = DEFAULT_TORCH_THREADS, use_cache: bool = True,
+                          roi_first: bool = False,
+                          progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Dict]:
+    """
+    Analizza tutte le locandine e restituisce ``{image_path: {'result': ..., 'error': ...}}``.
+    ``progress_callback(completati, totale, image_path)`` viene chiamata dopo ogni file.
+    """
+    results = {}
+    total = len(image_paths)
+    for done, (path, result, error) in enumerate(
+            iter_analyze_posters(image_paths, workers, torch_threads, use_cache, roi_first), start=1):
+        results[path] = {'result': result, 'error': error}
+        if progress_callback:
+            progress_callback(done, total, path)
+    return results
@@ -0,0 +1,107 @@
+"""
+Misura del tempo di import dei moduli del progetto (ogni scenario in un interprete nuovo)
+
+Per ogni scenario riporta il tempo complessivo, i moduli più lenti secondo
+``python -X importtime`` e quali dipendenze pesanti risultano caricate.
+
+Uso:
+    python bench_imports.py [--repeat 3] [--top 5] [--json risultati.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ('easyocr', 'torch', 'numpy', 'PIL', 'cv2', 'dateparser', 'github', 'docx', 'bs4',
+                 'streamlit', 'tkinter')
+
+# Scenario -> codice eseguito dopo l'import (deve restare leggero)
+SCENARIOS = {
+    'parsing testo (ocr_engine)': (
+        "from ocr_engine import LocandineOCR\n"
+        "LocandineOCR(use_cache=False, server_address=None).analyze_from_text('SABATO 07 FEBBRAIO 2026 - GENOVA')"
+    ),
+    'parsing testo (event_parser)': (
+        "from event_parser import parse_event_text\n"
+        "parse_event_text('SABATO 07 FEBBRAIO 2026 - GENOVA')"
+    ),
+    'export Word (import word_generator)': "from word_generator import WordGenerator",
+    'backup (import github_manager)': "from github_manager import GithubManager",
+    'analisi in blocco (import batch_ocr)': "import batch_ocr",
+}
+
+_START_MARKER = '-- inizio scenario --'
+_PROBE = """
+import sys, time, json
+sys.stderr.write({marker!r} + '\\n')
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+"""
+
+
+def run_scenario(code: str) -> Dict:
+    """Esegue lo scenario in un processo nuovo con -X importtime"""
+    probe = _PROBE.format(code=code, heavy=HEAVY_MODULES, marker=_START_MARKER)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=HERE,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        last_line = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'errore'
+        return {'error': last_line}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['modules'] = parse_importtime(proc.stderr)
+    return result
+
+
+def parse_importtime(stderr: str) -> List[tuple]:
+    """
+    Righe di -X importtime come (modulo, µs cumulativi) per i soli import di primo
+    livello fatti dallo scenario (quelli dell'avvio dell'interprete sono esclusi)
+    """
+    modules = []
+    _, _, stderr = stderr.partition(_START_MARKER)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            modules.append((name.strip(), int(cumulative)))
+    return modules
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report dei tempi di import dei moduli del progetto")
+    parser.add_argument('--repeat', type=int, default=3, help="Esecuzioni per scenario (si tiene la migliore)")
+    parser.add_argument('--top', type=int, default=5, help="Moduli più lenti da mostrare per scenario")
+    parser.add_argument('--json', help="Salva i risultati in questo file JSON")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for name, code in SCENARIOS.items():
+        runs = [run_scenario(code) for _ in range(max(1, args.repeat))]
+        ok = [run for run in runs if 'error' not in run] or runs
+        best = min(ok, key=lambda run: run.get('seconds', float('inf')))
+        report[name] = best
+        if 'error' in best:
+            print(f"{name:<38} ERRORE: {best['error']}")
+            continue
+        heavy = ', '.join(best['heavy']) or 'nessuna'
+        print(f"{name:<38} {best['seconds'] * 1000:>8.1f} ms   dipendenze pesanti: {heavy}")
+        for module, micros in sorted(best['modules'], key=lambda m: -m[1])[:args.top]:
+            print(f"    {module:<34} {micros / 1000:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Risultati salvati in {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Benchmark OCR: latenza per fase, memoria di picco e accuratezza dei campi
+
+Uso:
+    python bench_ocr.py synthetic [-n 30] [--seed 42] [--noise 0 1 2] [--backend stock] [--compare precedente.json]
+    python bench_ocr.py backends --images uploads [--backends float32 stock] [--limit 10] [--json risultati.json]
+
+Il comando ``synthetic`` genera locandine con campi noti (synthetic_posters.py) e salva
+i risultati in bench_results/ocr_<data>.json, confrontabili tra un'esecuzione e l'altra.
+"""
+import argparse
+import difflib
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from event_parser import FIELDS
+
+
+IMAGE_PATTERNS = ('*.png', '*.jpg', '*.jpeg', '*.PNG', '*.JPG', '*.JPEG')
+RESULTS_DIR = 'bench_results'
+STAGES = ('preprocess', 'detect', 'recognize', 'remote', 'parse')
+ACCURACY_FIELDS = ('date_iso', 'time', 'location', 'venue', 'address')
+
+
+def find_images(folder: str, limit: int = 0) -> List[str]:
+    paths = sorted({p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(folder, pattern))})
+    return paths[:limit] if limit else paths
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Similarità a livello di carattere tra due testi OCR (1.0 = identici)"""
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Memoria residente di picco del processo in MB (None se non misurabile)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux riporta KB, macOS byte
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+        except (ImportError, AttributeError):
+            return None
+
+
+def normalize_field(field: str, value) -> str:
+    """Forma canonica di un campo per il confronto con la verità (maiuscole, spazi, punteggiatura)"""
+    value = str(value or '').strip()
+    if field == 'time':
+        match = re.search(r'(\d{1,2})[:.,](\d{2})', value)
+        return f"{int(match.group(1))}:{match.group(2)}" if match else value
+    if field == 'date_iso':
+        return value
+    value = re.sub(r'[^\w\s]', ' ', value.casefold())
+    return ' '.join(value.split())
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize_timings(samples: List[Dict]) -> Dict:
+    """Media e p95 (in ms) di ogni fase sulle immagini analizzate"""
+    summary = {}
+    for stage in STAGES + ('total',):
+        values = [s[stage] for s in samples if stage in s]
+        if values:
+            summary[stage] = {
+                'mean_ms': round(sum(values) / len(values) * 1000, 1),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+            }
+    return summary
+
+
+def run_synthetic(count: int, seed: int, noise_levels, backend: Optional[str], roi_first: bool,
+                  out_dir: Optional[str] = None) -> Dict:
+    """Genera le locandine sintetiche, le analizza (senza cache) e misura tempi e accuratezza"""
+    from ocr_engine import LocandineOCR
+    from synthetic_posters import generate_posters
+
+    out_dir = out_dir or tempfile.mkdtemp(prefix='locandine_bench_')
+    posters = generate_posters(out_dir, count, seed=seed, noise_levels=tuple(noise_levels))
+
+    start = time.perf_counter()
+    ocr = LocandineOCR(use_cache=False, backend=backend, roi_first=roi_first)
+    if ocr.client is None:
+        ocr.reader  # Caricamento modelli fuori dalle misure per immagine
+    load_seconds = time.perf_counter() - start
+
+    samples, matches, per_image = [], {f: 0 for f in ACCURACY_FIELDS}, []
+    by_noise: Dict[int, List[int]] = {}
+    for poster in posters:
+        t0 = time.perf_counter()
+        result = ocr.analyze_poster(poster['image_path'])
+        timings = dict(result['preprocess'].get('timings', {}), total=time.perf_counter() - t0)
+        samples.append(timings)
+
+        truth = poster['truth']
+        fields = {}
+        for field in ACCURACY_FIELDS:
+            ok = normalize_field(field, result.get(field)) == normalize_field(field, truth[field])
+            matches[field] += ok
+            fields[field] = {'expected': truth[field], 'found': result.get(field, ''), 'ok': ok}
+        correct = sum(f['ok'] for f in fields.values())
+        by_noise.setdefault(poster['noise'], []).append(correct)
+        per_image.append({
+            'image': os.path.basename(poster['image_path']),
+            'font': poster['font'],
+            'font_size': poster['font_size'],
+            'noise': poster['noise'],
+            'ocr_path': result.get('ocr_path'),
+            'timings_ms': {k: round(v * 1000, 1) for k, v in timings.items()},
+            'fields': fields,
+        })
+
+    n = len(posters)
+    return {
+        'kind': 'synthetic',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {'count': n, 'seed': seed, 'noise_levels': list(noise_levels), 'roi_first': roi_first,
+                   'backend': ocr.backend, 'effective_backend': ocr.effective_backend,
+                   'engine_version': ocr.engine_version},
+        'load_seconds': round(load_seconds, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'timings': summarize_timings(samples),
+        'accuracy': {field: round(matches[field] / n, 4) if n else 0.0 for field in ACCURACY_FIELDS},
+        'accuracy_by_noise': {str(level): round(sum(v) / (len(v) * len(ACCURACY_FIELDS)), 4)
+                              for level, v in sorted(by_noise.items())},
+        'images': per_image,
+    }
+
+
+def compare_runs(previous: Dict, current: Dict) -> List[str]:
+    """Righe di confronto (tempi e accuratezza) tra due risultati del comando synthetic"""
+    lines = []
+    for stage, stats in current['timings'].items():
+        old = previous.get('timings', {}).get(stage)
+        if old:
+            delta = stats['mean_ms'] - old['mean_ms']
+            lines.append(f"  {stage:<10} {old['mean_ms']:>8.1f} -> {stats['mean_ms']:>8.1f} ms ({delta:+.1f})")
+    for field, value in current['accuracy'].items():
+        old = previous.get('accuracy', {}).get(field)
+        if old is not None:
+            lines.append(f"  {field:<10} {old:>8.1%} -> {value:>8.1%} ({(value - old) * 100:+.1f} pt)")
+    old_rss, rss = previous.get('peak_rss_mb'), current.get('peak_rss_mb')
+    if old_rss and rss:
+        lines.append(f"  {'RSS':<10} {old_rss:>8.1f} -> {rss:>8.1f} MB")
+    return lines
+
+
+def print_synthetic(report: Dict):
+    cfg = report['config']
+    print(f"Locandine sintetiche: {cfg['count']} (seed {cfg['seed']}, disturbo {cfg['noise_levels']}), "
+          f"backend {cfg['effective_backend']}, caricamento {report['load_seconds']}s")
+    print("Latenza per fase:")
+    for stage, stats in report['timings'].items():
+        print(f"  {stage:<10} media {stats['mean_ms']:>8.1f} ms   p95 {stats['p95_ms']:>8.1f} ms")
+    print("Accuratezza campi:")
+    for field, value in report['accuracy'].items():
+        print(f"  {field:<10} {value:.1%}")
+    for level, value in report['accuracy_by_noise'].items():
+        print(f"  disturbo {level}: {value:.1%}")
+    if report['peak_rss_mb'] is not None:
+        print(f"Memoria di picco: {report['peak_rss_mb']} MB")
+
+
+def run_backend(backend: str, images: List[str]) -> Dict:
+    """Analizza tutte le immagini con il backend indicato (senza cache) e misura i tempi"""
+    from ocr_engine import LocandineOCR
+
+    start = time.perf_counter()
+    ocr = LocandineOCR(use_cache=False, backend=backend, server_address=None)
+    ocr.reader  # Caricamento modelli fuori dalle misure per immagine
+    load_seconds = time.perf_counter() - start
+
+    per_image = {}
+    for path in images:
+        t0 = time.perf_counter()
+        result = ocr.analyze_poster(path)
+        per_image[path] = {
+            'seconds': time.perf_counter() - t0,
+            'text': result['full_text'],
+            'fields': {field: result.get(field, '') for field in FIELDS},
+        }
+    latencies = sorted(item['seconds'] for item in per_image.values())
+    return {
+        'backend': backend,
+        'effective_backend': ocr.effective_backend,
+        'load_seconds': round(load_seconds, 2),
+        'mean_seconds': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p50_seconds': round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+        'images': per_image,
+    }
+
+
+def compare(reference: Dict, candidate: Dict) -> Dict:
+    """Accuratezza del candidato rispetto al backend di riferimento"""
+    similarities, field_matches, field_total = [], 0, 0
+    for path, ref in reference['images'].items():
+        cand = candidate['images'].get(path)
+        if cand is None:
+            continue
+        similarities.append(text_similarity(ref['text'], cand['text']))
+        for field in FIELDS:
+            field_total += 1
+            field_matches += ref['fields'][field] == cand['fields'][field]
+    return {
+        'text_similarity': round(sum(similarities) / len(similarities), 4) if similarities else 0.0,
+        'field_agreement': round(field_matches / field_total, 4) if field_total else 0.0,
+        'speedup': round(reference['mean_seconds'] / candidate['mean_seconds'], 2) if candidate['mean_seconds'] else 0.0,
+    }
+
+
+def cmd_backends(args) -> int:
+    images = find_images(args.images, args.limit)
+    if not images:
+        print(f"Nessuna immagine trovata in {args.images}")
+        return 1
+
+    print(f"Immagini: {len(images)} da {args.images}")
+    runs = [run_backend(backend, images) for backend in args.backends]
+    reference = runs[0]
+    report = {'images': len(images), 'reference': reference['backend'], 'backends': []}
+    for run in runs:
+        summary = {k: v for k, v in run.items() if k != 'images'}
+        summary.update(compare(reference, run))
+        report['backends'].append(summary)
+        print(f"  {run['backend']:<7} (effettivo: {run['effective_backend']:<7}) "
+              f"caricamento {summary['load_seconds']:>6.2f}s  media {summary['mean_seconds']:>6.3f}s/img  "
+              f"speedup x{summary['speedup']:<5} testo {summary['text_similarity']:.1%}  "
+              f"campi {summary['field_agreement']:.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Risultati salvati in {args.json}")
+    return 0
+
+
+def cmd_synthetic(args) -> int:
+    report = run_synthetic(args.n, args.seed, args.noise, args.backend, args.roi_first, args.out_dir)
+    print_synthetic(report)
+
+    output = args.json or os.path.join(RESULTS_DIR, f"ocr_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Risultati salvati in {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"Confronto con {args.compare} ({previous.get('created_at', '?')}):")
+        for line in compare_runs(previous, report):
+            print(line)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark OCR delle locandine")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    syn = sub.add_parser('synthetic', help="Locandine sintetiche con campi noti: tempi per fase e accuratezza")
+    syn.add_argument('-n', type=int, default=30, help="Numero di locandine (default: 30)")
+    syn.add_argument('--seed', type=int, default=42, help="Seme del generatore (default: 42)")
+    syn.add_argument('--noise', type=int, nargs='+', default=[0, 1, 2], help="Livelli di disturbo (0-3)")
+    syn.add_argument('--backend', default=None, help="Backend OCR (stock/float32, default: LOCANDINE_OCR_BACKEND)")
+    syn.add_argument('--roi-first', action='store_true', help="Lettura prima delle fasce di intestazione")
+    syn.add_argument('--out-dir', help="Cartella per le immagini generate (default: temporanea)")
+    syn.add_argument('--json', help=f"File dei risultati (default: {RESULTS_DIR}/ocr_<data>.json)")
+    syn.add_argument('--compare', help="Risultato precedente da confrontare")
+    syn.set_defaults(func=cmd_synthetic)
+
+    bk = sub.add_parser('backends', help="Confronto backend OCR (stock, quantizzato int8, vs float32) su locandine reali")
+    bk.add_argument('--images', default='uploads', help="Cartella con le locandine (default: uploads)")
+    bk.add_argument('--backends', nargs='+', default=['float32', 'stock'], help="Backend da confrontare (il primo è il riferimento)")
+    bk.add_argument('--limit', type=int, default=0, help="Numero massimo di immagini")
+    bk.add_argument('--json', help="Salva i risultati in questo file JSON")
+    bk.set_defaults(func=cmd_backends)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
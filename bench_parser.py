@@ -0,0 +1,230 @@
+"""
+Benchmark e test di regressione del motore di estrazione campi (event_parser) sugli eventi di data.json
+
+Gli eventi di data.json sono stati corretti a mano: sono la verità di riferimento.
+L'accuratezza si misura solo sui testi reali: quello OCR salvato con l'evento (``ocr.text``,
+presente per gli eventi creati dall'OCR) o quello di locandine.json prodotto da
+estraiLocandine (abbinato per nome immagine). Gli eventi senza testo reale entrano, con un
+testo ricostruito dai campi, solo nella misura del throughput: valutarli sarebbe circolare.
+
+Il throughput dipende dalla macchina: il controllo si applica solo se il riferimento è
+stato registrato sulla stessa macchina, altrimenti è solo informativo.
+
+Uso:
+    python bench_parser.py [--data data.json] [--locandine locandine.json] [--repeat 200]
+    python bench_parser.py --check            # exit 1 se accuratezza (o throughput) peggiorano
+    python bench_parser.py --update-baseline  # registra i valori attuali come riferimento
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from date_utils import to_iso
+from event_parser import parse_event_text, parse_json_event
+
+
+DEFAULT_BASELINE = 'bench_parser_baseline.json'
+# Campi confrontati con data.json (il titolo corretto a mano non è derivabile dal testo)
+ACCURACY_FIELDS = ('date_iso', 'time', 'location', 'venue', 'address', 'description')
+# Provenienza dei testi non reali (esclusi dall'accuratezza)
+RECONSTRUCTED = 'ricostruito'
+# Tolleranze di default: il throughput varia molto tra macchine, l'accuratezza no
+DEFAULT_MAX_SLOWDOWN = 0.30
+DEFAULT_MAX_ACCURACY_DROP = 0.0
+
+
+def event_to_text(event: Dict) -> str:
+    """
+    Ricostruisce il testo della locandina nel formato dei documenti del comitato
+    (lo stesso che estraiLocandine legge dalla cella di destra). Serve solo per il throughput.
+    """
+    header = event.get('title', '').replace(' - ', ' – ')
+    body = f"{event.get('description', '').strip()} – Ore {event.get('time', '').strip()} – {event.get('venue', '').strip()}"
+    return "\n".join(line for line in (header, body, event.get('address', '').strip()) if line)
+
+
+def build_corpus(events: List[Dict]) -> List[str]:
+    return [event_to_text(ev) for ev in events]
+
+
+def load_raw_texts(path: Optional[str]) -> Dict[str, str]:
+    """Testi grezzi di locandine.json (estraiLocandine) indicizzati per nome immagine"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return {entry['image_file']: entry['text'] for entry in entries
+            if entry.get('image_file') and entry.get('text')}
+
+
+def corpus_texts(events: List[Dict], raw_texts: Dict[str, str]) -> List[tuple]:
+    """Testo da analizzare per ogni evento e relativa provenienza (ocr, locandine, ricostruito)"""
+    corpus = []
+    for ev in events:
+        ocr_text = (ev.get('ocr') or {}).get('text')
+        raw = raw_texts.get(os.path.basename(ev.get('image_path', '')))
+        if ocr_text:
+            corpus.append((ocr_text, 'ocr'))
+        elif raw:
+            corpus.append((raw, 'locandine'))
+        else:
+            corpus.append((event_to_text(ev), RECONSTRUCTED))
+    return corpus
+
+
+def expected_fields(event: Dict) -> Dict[str, str]:
+    expected = {field: event.get(field, '') for field in ACCURACY_FIELDS}
+    expected['date_iso'] = event.get('date_iso') or to_iso(event.get('date', ''))
+    return expected
+
+
+def _norm(value) -> str:
+    return ' '.join(str(value or '').split())
+
+
+def accuracy(func, items: List, events: List[Dict]) -> Dict[str, float]:
+    """Quota di corrispondenze esatte (spazi normalizzati) per campo rispetto a data.json"""
+    matches = {field: 0 for field in ACCURACY_FIELDS}
+    for item, event in zip(items, events):
+        parsed = func(item)
+        for field, value in expected_fields(event).items():
+            matches[field] += _norm(parsed.get(field)) == _norm(value)
+    n = len(events)
+    result = {field: round(count / n, 4) if n else 0.0 for field, count in matches.items()}
+    result['overall'] = round(sum(matches.values()) / (n * len(ACCURACY_FIELDS)), 4) if n else 0.0
+    return result
+
+
+def machine_id() -> str:
+    """Identifica la macchina del riferimento (il throughput si confronta solo sulla stessa)"""
+    return f"{platform.node()} {platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+
+
+def check_regressions(results: Dict, baseline: Dict, max_slowdown: float, max_accuracy_drop: float,
+                      check_throughput: bool = True) -> List[str]:
+    """Elenco delle regressioni rispetto al riferimento (vuoto se tutto ok)"""
+    problems = []
+    for name, current in results.items():
+        ref = baseline.get('parsers', {}).get(name)
+        if ref is None:
+            continue
+        floor = ref['records_per_second'] * (1 - max_slowdown)
+        if check_throughput and current['records_per_second'] < floor:
+            problems.append(f"{name}: throughput {current['records_per_second']:,.0f} record/s "
+                            f"< {floor:,.0f} (riferimento {ref['records_per_second']:,.0f})")
+        for field, value in current['accuracy'].items():
+            ref_value = ref.get('accuracy', {}).get(field)
+            if ref_value is not None and value < ref_value - max_accuracy_drop:
+                problems.append(f"{name}: accuratezza {field} {value:.1%} < {ref_value:.1%}")
+    return problems
+
+
+def measure(func, items: List, repeat: int) -> Dict:
+    """Esegue func su tutti gli elementi ``repeat`` volte e restituisce il throughput"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    elapsed = time.perf_counter() - start
+    n = len(items) * repeat
+    return {
+        'records': n,
+        'seconds': round(elapsed, 4),
+        'records_per_second': round(n / elapsed, 1) if elapsed else float('inf'),
+        'us_per_record': round(elapsed / n * 1e6, 2) if n else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark e regressione del parser eventi su data.json")
+    parser.add_argument('--data', default='data.json', help="File eventi (default: data.json)")
+    parser.add_argument('--locandine', default='locandine.json',
+                        help="Testi grezzi di estraiLocandine, se presenti (default: locandine.json)")
+    parser.add_argument('--repeat', type=int, default=200, help="Ripetizioni del corpus")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f"File di riferimento (default: {DEFAULT_BASELINE})")
+    parser.add_argument('--check', action='store_true', help="Confronta con il riferimento, exit 1 se peggiora")
+    parser.add_argument('--update-baseline', action='store_true', help="Salva i risultati come nuovo riferimento")
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help="Calo di throughput tollerato sulla stessa macchina (default: 0.30 = 30%%)")
+    parser.add_argument('--max-accuracy-drop', type=float, default=DEFAULT_MAX_ACCURACY_DROP,
+                        help="Calo di accuratezza tollerato per campo (default: 0)")
+    args = parser.parse_args(argv)
+
+    from ocr_engine import LocandineOCR  # Solo parsing del testo: nessun modello caricato
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        events = json.load(f)
+    corpus = corpus_texts(events, load_raw_texts(args.locandine))
+    texts = [text for text, _ in corpus]
+    entries = [{'text': t, 'image_file': os.path.basename(ev.get('image_path', ''))}
+               for t, ev in zip(texts, events)]
+    real = [i for i, (_, source) in enumerate(corpus) if source != RECONSTRUCTED]
+    real_events = [events[i] for i in real]
+    sources = {}
+    for _, source in corpus:
+        sources[source] = sources.get(source, 0) + 1
+
+    print(f"Corpus: {len(texts)} eventi da {args.data} ({', '.join(f'{k}: {v}' for k, v in sources.items())}), "
+          f"{args.repeat} ripetizioni")
+    if not real:
+        print("  Nessun testo reale (ocr.text o locandine.json): accuratezza non misurata, solo throughput")
+    results = {}
+    for name, func, items in [
+        ('parse_event_text', parse_event_text, texts),
+        ('LocandineOCR.parse_event_text', LocandineOCR(use_cache=False, server_address=None).parse_event_text, texts),
+        ('parse_json_event', parse_json_event, entries),
+    ]:
+        for item in items:
+            func(item)  # Riscaldamento delle cache
+        result = measure(func, items, args.repeat)
+        result['accuracy'] = accuracy(func, [items[i] for i in real], real_events) if real else {}
+        results[name] = result
+        line = f"  {name:<30} {result['records_per_second']:>12,.0f} record/s ({result['us_per_record']} µs/record)"
+        if real:
+            line += f"  accuratezza {result['accuracy']['overall']:.1%} su {len(real)} testi reali"
+        print(line)
+        if real:
+            print("    " + "  ".join(f"{field} {value:.0%}" for field, value in result['accuracy'].items()
+                                     if field != 'overall'))
+
+    status = 0
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"Riferimento {args.baseline} non trovato: eseguire con --update-baseline")
+            return 2
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        same_machine = baseline.get('machine') == machine_id()
+        if not same_machine:
+            print(f"Riferimento registrato su un'altra macchina ({baseline.get('machine', 'sconosciuta')}): "
+                  "throughput solo informativo")
+        problems = check_regressions(results, baseline, args.max_slowdown, args.max_accuracy_drop,
+                                     check_throughput=same_machine)
+        for problem in problems:
+            print(f"REGRESSIONE {problem}")
+        if problems:
+            status = 1
+        else:
+            print(f"Nessuna regressione rispetto a {args.baseline}")
+
+    if args.update_baseline:
+        baseline = {
+            'machine': machine_id(),
+            'corpus': {'events': len(texts), 'sources': sources, 'real_texts': len(real)},
+            'parsers': {name: {'records_per_second': r['records_per_second'], 'accuracy': r['accuracy']}
+                        for name, r in results.items()},
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"Riferimento aggiornato: {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
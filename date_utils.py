@@ -0,0 +1,103 @@
+"""
+Normalizzazione veloce delle date italiane delle locandine
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Optional
+
+
+MONTHS = {
+    'gennaio': 1, 'febbraio': 2, 'marzo': 3, 'aprile': 4, 'maggio': 5, 'giugno': 6,
+    'luglio': 7, 'agosto': 8, 'settembre': 9, 'ottobre': 10, 'novembre': 11, 'dicembre': 12,
+    # Abbreviazioni usate sulle locandine
+    'gen': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'mag': 5, 'giu': 6,
+    'lug': 7, 'ago': 8, 'set': 9, 'sett': 9, 'ott': 10, 'nov': 11, 'dic': 12,
+}
+
+# 15/02/2026, 15.02.2026, 15-02-26
+_NUMERIC_RE = re.compile(r'\b(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{4}|\d{2})\b')
+# 2026-02-15 (formato ISO, es. campo date_iso o dati importati)
+_ISO_RE = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+# 07 FEBBRAIO 2026, Sabato 15 Feb, 1° marzo
+_NAMED_RE = re.compile(r'\b(\d{1,2})(?:°|º)?\s+([A-Za-zÀ-ÿ]{3,9})\.?(?:\s+(\d{4}))?', re.IGNORECASE)
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _dateparser_fallback(text: str) -> Optional[date]:
+    """Fallback su dateparser (lento) per i formati non coperti dai percorsi veloci"""
+    import dateparser
+    try:
+        dt = dateparser.parse(text, languages=['it'])
+    except Exception:
+        return None
+    return dt.date() if dt else None
+
+
+@lru_cache(maxsize=8192)
+def _parse_cached(text: str, default_year: int, use_fallback: bool = True) -> Optional[date]:
+    m = _NUMERIC_RE.search(text)
+    if m:
+        day, month, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
+        if year < 100:
+            year += 2000
+        return _safe_date(year, month, day)
+
+    m = _ISO_RE.search(text)
+    if m:
+        return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+    for m in _NAMED_RE.finditer(text):
+        month = MONTHS.get(m.group(2).lower())
+        if month:
+            year = int(m.group(3)) if m.group(3) else default_year
+            return _safe_date(year, month, int(m.group(1)))
+
+    return _dateparser_fallback(text) if use_fallback else None
+
+
+def parse_italian_date(text: str, default_year: Optional[int] = None,
+                       use_fallback: bool = True) -> Optional[date]:
+    """
+    Converte una data scritta come sulle locandine ("07 FEBBRAIO 2026", "15/02/2026",
+    "Sabato 15 Feb") in un oggetto date. I formati comuni sono gestiti con regex
+    precompilate; gli altri passano da dateparser. Entrambi i percorsi sono memoizzati.
+    Se manca l'anno si usa ``default_year`` (default: anno corrente).
+    Con ``use_fallback=False`` si usano solo i percorsi veloci.
+    """
+    if not text or not text.strip():
+        return None
+    return _parse_cached(text.strip(), default_year or datetime.now().year, use_fallback)
+
+
+def to_iso(text: str, default_year: Optional[int] = None, use_fallback: bool = True) -> str:
+    """Data normalizzata in formato ISO (AAAA-MM-GG), stringa vuota se non riconosciuta"""
+    d = parse_italian_date(text, default_year, use_fallback)
+    return d.isoformat() if d else ""
+
+
+def event_date(event: Dict) -> Optional[date]:
+    """
+    Data dell'evento: usa il campo precalcolato ``date_iso`` se presente,
+    altrimenti normalizza il campo testuale ``date``
+    """
+    iso = event.get('date_iso')
+    if iso:
+        try:
+            return date.fromisoformat(iso)
+        except ValueError:
+            pass
+    return parse_italian_date(event.get('date', ''))
+
+
+def refresh_date_iso(event: Dict) -> Dict:
+    """Ricalcola ``date_iso`` dal campo ``date`` (da chiamare a ogni modifica della data)"""
+    event['date_iso'] = to_iso(event.get('date', ''))
+    return event
@@ -0,0 +1,193 @@
+"""
+Modello compatto di un evento: campi di data.json in __slots__ più i valori derivati
+(data, luogo normalizzato, provincia e regione, chiave e hash dell'immagine) calcolati una volta
+sola quando l'evento viene caricato o salvato.
+
+Un Event non si modifica: per cambiarlo si lavora su ``to_dict()`` e si salva il dizionario
+(che diventa un nuovo Event alla rilettura). ``get()`` e ``[]`` permettono al codice che
+legge i dizionari di usare anche gli Event.
+"""
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from date_utils import parse_italian_date
+from phash import parse_hash
+
+
+# Campi noti dello schema di data.json (gli altri finiscono in ``extra``)
+FIELDS = ('id', 'title', 'date', 'date_iso', 'time', 'location', 'venue', 'address', 'description',
+          'image_path', 'image_hash', 'phash', 'added_on', 'is_new', 'version', 'ocr')
+
+# --- PROVINCE E REGIONI (statistiche del documento Word) ---
+PROV_TO_REG = {
+    'GENOVA': 'LIGURIA', 'GE': 'LIGURIA',
+    'LA SPEZIA': 'LIGURIA', 'SP': 'LIGURIA',
+    'SAVONA': 'LIGURIA', 'SV': 'LIGURIA',
+    'IMPERIA': 'LIGURIA', 'IM': 'LIGURIA',
+    'MASSA': 'TOSCANA', 'MS': 'TOSCANA', 'MASSA CARRARA': 'TOSCANA', 'CARRARA': 'TOSCANA'
+}
+
+# Mappatura nomi per uniformità (Tutto sotto MASSA)
+PROV_NORM = {
+    'GE': 'GENOVA', 'SP': 'LA SPEZIA', 'SV': 'SAVONA', 'IM': 'IMPERIA',
+    'MS': 'MASSA', 'MASSA CARRARA': 'MASSA', 'CARRARA': 'MASSA'
+}
+
+# Città e frazioni senza provincia nell'indirizzo
+CITY_FALLBACK = {
+    'PEGLI': 'GENOVA', 'BOLZANETO': 'GENOVA', 'VOLTRI': 'GENOVA', 'NERVI': 'GENOVA',
+    'SARZANA': 'LA SPEZIA', 'FOLLO': 'LA SPEZIA', 'LERICI': 'LA SPEZIA',
+    'BRUGNATO': 'LA SPEZIA', 'PIGNONE': 'LA SPEZIA',
+    'CARCARE': 'SAVONA', 'VARAZZE': 'SAVONA',
+    'AULLA': 'MASSA', 'CARRARA': 'MASSA'
+}
+
+_ADDRESS_SPLIT_RE = re.compile(r'[\s\-,(]+')
+
+
+def classify_place(address: str, location: str) -> Tuple[str, str]:
+    """
+    (provincia, regione) dell'evento: prima dall'ultima parte dell'indirizzo ("... - GE",
+    "... (SP)"), poi dalle città note, infine dal luogo stesso. ('', '') se non riconosciuta.
+    """
+    addr = address.strip().upper()
+    loc = location.strip().upper()
+    province = None
+    if addr:
+        last_part = _ADDRESS_SPLIT_RE.split(addr)[-1].strip(' )')
+        if last_part in PROV_TO_REG:
+            province = PROV_NORM.get(last_part, last_part)
+    if not province:
+        province = CITY_FALLBACK.get(loc)
+    if not province and loc in PROV_TO_REG:
+        province = PROV_NORM.get(loc, loc)
+    if province:
+        return province, PROV_TO_REG[province]
+    return '', ''
+
+
+@lru_cache(maxsize=4096)
+def _day_from_iso(iso: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(iso)
+    except ValueError:
+        return None
+
+
+def _shared(original: str, normalized: str) -> str:
+    """Riusa la stringa originale se la normalizzazione non la cambia (meno memoria)"""
+    return original if normalized == original else normalized
+
+
+# Le tuple con l'ordine delle chiavi sono condivise tra gli eventi con lo stesso schema
+_KEY_ORDERS: Dict[tuple, tuple] = {}
+
+
+class Event:
+    """Evento in sola lettura con campi precalcolati (vedi il docstring del modulo)"""
+
+    __slots__ = FIELDS + ('extra', '_order', 'day', 'location_key', 'image_key', 'phash_value', 'province',
+                          'region')
+
+    id: str
+    title: str
+    date: str
+    date_iso: str
+    time: str
+    location: str
+    venue: str
+    address: str
+    description: str
+    image_path: str
+    image_hash: str
+    phash: str                  # Hash percettivo (dHash) dell'immagine, in esadecimale
+    added_on: str
+    is_new: bool
+    version: Optional[int]
+    ocr: Optional[Dict]
+    extra: Optional[Dict]       # Chiavi fuori schema (o campi noti a null), restituite tali e quali
+    day: Optional[date]         # Data dell'evento (None se non riconosciuta)
+    location_key: str           # Luogo maiuscolo senza spazi ai bordi
+    image_key: str              # Percorso dell'immagine senza spazi ai bordi
+    phash_value: Optional[int]  # phash come intero (per la distanza di Hamming)
+    province: str
+    region: str
+
+    def __init__(self, data: Dict):
+        extra = None
+        for field in FIELDS:
+            value = data.get(field)
+            if value is None and field in data:
+                extra = extra or {}
+                extra[field] = None
+            object.__setattr__(self, field, value)
+        for key in data:
+            if key not in FIELDS:
+                extra = extra or {}
+                extra[key] = data[key]
+        order = tuple(data)
+        object.__setattr__(self, 'extra', extra)
+        object.__setattr__(self, '_order', _KEY_ORDERS.setdefault(order, order))
+        self._derive()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Event':
+        return data if isinstance(data, cls) else cls(data)
+
+    def _derive(self):
+        location = self.location or ''
+        image_path = self.image_path or ''
+        derived = {
+            # Le date sono memoizzate: eventi con la stessa data condividono l'oggetto
+            'day': (_day_from_iso(self.date_iso) if self.date_iso else None) or parse_italian_date(self.date or ''),
+            'location_key': _shared(location, location.strip().upper()),
+            'image_key': _shared(image_path, image_path.strip()),
+            'phash_value': parse_hash(self.phash),
+        }
+        derived['province'], derived['region'] = classify_place(self.address or '', location)
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Event è in sola lettura: modificare to_dict() e salvare")
+
+    # --- ACCESSO COME DIZIONARIO ---
+
+    def get(self, key: str, default=None):
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        if key in FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __getitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._order
+
+    def to_dict(self) -> Dict:
+        """Dizionario nello schema di data.json, con le stesse chiavi e nello stesso ordine"""
+        return {key: self.get(key) for key in self._order}
+
+    # --- VALORI DERIVATI ---
+
+    @property
+    def day_iso(self) -> str:
+        return self.day.isoformat() if self.day else ''
+
+    @property
+    def sort_day(self) -> date:
+        """Data per l'ordinamento cronologico (senza data in fondo)"""
+        return self.day or date.max
+
+    def is_expired(self, today: date) -> bool:
+        return self.day is not None and self.day < today
+
+    def __repr__(self) -> str:
+        return f"Event({self.id!r}, {self.title!r}, {self.day_iso or 'senza data'})"
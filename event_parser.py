@@ -0,0 +1,249 @@
+"""
+Motore unico di estrazione dei campi evento dal testo delle locandine
+(testo OCR o testo già estratto da estraiLocandine)
+"""
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from date_utils import to_iso
+
+
+# --- REGOLE PRECOMPILATE ---
+_MONTHS = r'(?:gennaio|febbraio|marzo|aprile|maggio|giugno|luglio|agosto|settembre|ottobre|novembre|dicembre)'
+
+# Un solo scanner con alternative nominate: ogni riga viene tokenizzata in un'unica passata
+_TOKEN_RE = re.compile(
+    # Prefiltro: un token può iniziare solo con una cifra o con l'iniziale di una parola chiave
+    r'(?=[0-9oOhHpPvVcClLsS])\b(?:'
+    r'(?P<time_ore>(?:ore|h)\s*(?P<ore_value>\d{1,2}[:.,]\d{2})\b)'
+    r'|(?P<date_num>\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}\b)'
+    r'|(?P<time>\d{1,2}[:.]\d{2}\b)'
+    r'|(?P<day_month>\d{1,2}\s+' + _MONTHS + r'\b)'
+    r'|(?P<presso>presso\s+)'
+    r'|(?P<address>(?:via|vico|piazza|corso|largo|strada)\s+[a-zà-ÿ])'
+    r')',
+    re.IGNORECASE
+)
+_HEADER_SPLIT_RE = re.compile(r'\s+[–-]\s+')
+_YEAR_RE = re.compile(r'\d{4}')
+_ADDRESS_RE = re.compile(r'(?:Via|Vico|Piazza|Corso|Largo|Strada)\s+[A-Z][a-z]+.*?\d+', re.IGNORECASE)
+_VENUE_END_RE = re.compile(r'\s*[–\-|,]\s')
+# Separatori da togliere ai bordi dei campi (dopo "h 16.30," o attorno a una data rimossa)
+_SEPARATORS = ' –-,|'
+
+# Incrementare a ogni modifica delle regole: gli eventi con versione vecchia
+# possono essere ri-analizzati dal testo OCR salvato (vedi reparse_events)
+PARSER_VERSION = 3
+
+DEFAULT_YEAR = "2026"
+DEFAULT_TITLE = "Nuovo Evento"
+
+FIELDS = ('title', 'date', 'location', 'description', 'time', 'venue', 'address')
+
+
+def _tokenize(line: str) -> List[tuple]:
+    """Tokenizza una riga: lista di (tipo, match)"""
+    return [(m.lastgroup, m) for m in _TOKEN_RE.finditer(line)]
+
+
+def _with_year(raw_date: str) -> str:
+    """Aggiunge l'anno di default se la stringa sembra una data senza anno"""
+    if raw_date and DEFAULT_YEAR not in raw_date and not _YEAR_RE.search(raw_date):
+        # Evita di aggiungerlo se la stringa è spazzatura corta
+        if len(raw_date) > 3:
+            raw_date += f" {DEFAULT_YEAR}"
+    return raw_date
+
+
+def _drop_fragment(text: str, fragment: str) -> str:
+    """Toglie ``fragment`` dal testo insieme ai separatori che lo circondano"""
+    start = text.find(fragment)
+    if start < 0:
+        return text
+    before = text[:start].rstrip(_SEPARATORS)
+    after = text[start + len(fragment):].lstrip(_SEPARATORS)
+    return f"{before} {after}" if before and after else before or after
+
+
+def parse_event_text(text: str) -> Dict:
+    """
+    Analizza il testo di una locandina e lo suddivide nei campi evento.
+
+    Struttura attesa (come nei documenti del comitato):
+    - prima riga: ``DATA – LUOGO``
+    - righe successive: ``descrizione – Ore HH:MM – presso``
+    - indirizzo (Via, Piazza, ...) in qualsiasi riga
+
+    Restituisce anche ``date_iso`` con la data normalizzata.
+    """
+    data = {field: '' for field in FIELDS}
+    data['date_iso'] = ''
+
+    if not text:
+        return data
+
+    lines = [l.strip() for l in text.split('\n') if l.strip()]
+    if not lines:
+        data['title'] = DEFAULT_TITLE
+        return data
+
+    # 1. Prima riga (solitamente DATA - LUOGO)
+    first_line = lines[0]
+    header_tokens = _tokenize(first_line)
+    parts = _HEADER_SPLIT_RE.split(first_line, maxsplit=1)
+    data['date'] = _with_year(parts[0].strip())
+    if len(parts) > 1:
+        data['location'] = parts[1].strip()
+
+    # 2. Corpo: le righe successive formano un'unica riga logica
+    body = " ".join(lines[1:])
+    body_tokens = _tokenize(body) if body else []
+
+    time_ore = next((m for kind, m in body_tokens if kind == 'time_ore'), None)
+    if time_ore:
+        # Normalizza orario con i due punti
+        data['time'] = time_ore.group('ore_value').replace('.', ':').replace(',', ':')
+        # Testo PRIMA dell'orario -> DESCRIZIONE, testo DOPO -> PRESSO
+        data['description'] = body[:time_ore.start()].rstrip(_SEPARATORS)
+        # "Ore 16:30 – presso", ma anche "h 16.30, presso"
+        data['venue'] = body[time_ore.end():].lstrip(_SEPARATORS).strip()
+    else:
+        data['description'] = body
+        # Orario senza "Ore" (es. "16:30") come ripiego
+        bare_time = next((m for kind, m in body_tokens if kind == 'time'), None)
+        if bare_time:
+            data['time'] = bare_time.group(0).replace('.', ':')
+        # "presso ..." come ripiego per la struttura
+        presso = next((m for kind, m in body_tokens if kind == 'presso'), None)
+        if presso:
+            venue = body[presso.end():]
+            end = _VENUE_END_RE.search(venue)
+            data['venue'] = (venue[:end.start()] if end else venue).strip()
+
+    # 3. Data: se la prima riga non contiene una data, usa la prima data trovata nel testo.
+    # dateparser (lento) serve solo se lo scanner non ha riconosciuto nessuna data.
+    header_date = any(kind in ('date_num', 'day_month') for kind, _ in header_tokens)
+    data['date_iso'] = to_iso(data['date'], use_fallback=not header_date)
+    if not data['date_iso'] and not header_date:
+        other_date = next((m for kind, m in body_tokens if kind in ('date_num', 'day_month')), None)
+        if other_date:
+            data['date'] = _with_year(other_date.group(0))
+            data['date_iso'] = to_iso(data['date'], use_fallback=False)
+            # La data diventa un campo a sé: non resta in descrizione (e quindi nel titolo) o nel presso
+            for field in ('description', 'venue'):
+                data[field] = _drop_fragment(data[field], other_date.group(0))
+
+    # 4. Indirizzo (Via, Piazza, ecc.): regola completa solo sulle righe originali in cui lo
+    # scanner ha visto una parola chiave (nel corpo unito la regola scavalcherebbe gli a capo)
+    address_lines = [0] if any(kind == 'address' for kind, _ in header_tokens) else []
+    line_starts = list(accumulate(len(line) + 1 for line in lines[1:-1]))
+    line_starts.insert(0, 0)
+    for kind, m in body_tokens:
+        if kind == 'address':
+            line_no = bisect_right(line_starts, m.start())
+            if line_no not in address_lines:
+                address_lines.append(line_no)
+    for line_no in address_lines:
+        address_match = _ADDRESS_RE.search(lines[line_no])
+        if address_match:
+            data['address'] = address_match.group(0)
+            break
+
+    # Titolo di default se vuoto usa la descrizione troncata
+    if not data['title']:
+        data['title'] = data['description'][:50] + "..." if data['description'] else DEFAULT_TITLE
+
+    return data
+
+
+def parse_json_event(json_entry: Dict, image_base_path: str = "uploads") -> Dict:
+    """
+    Parsare un evento dal formato JSON locandine.json (prodotto da estraiLocandine).
+    Usa lo stesso motore di ``parse_event_text`` per coerenza,
+    rispettando la struttura a righe del testo.
+    """
+    text = json_entry.get('text', '')
+    image_file = json_entry.get('image_file', '')
+
+    data = parse_event_text(text)
+
+    # Aggiungi percorso immagine
+    if image_file:
+        # Forza l'uso di / anche su Windows per compatibilità Cloud
+        data['image_path'] = f"{image_base_path}/{image_file}"
+
+    # Fallback per il titolo se il parser lo ha lasciato vuoto o generico
+    # (sovrascrive solo se title manca o è quello di default)
+    if not data.get('title') or data.get('title') == DEFAULT_TITLE:
+        if data.get('date') and data.get('location'):
+            data['title'] = f"{data['date']} – {data['location']}"
+
+    return data
+
+
+def make_ocr_record(full_text: str, boxes: Optional[List] = None, parsed: Optional[Dict] = None) -> Dict:
+    """
+    Blocco ``ocr`` da salvare nell'evento: testo e box grezzi, versione del parser e
+    valori estratti automaticamente (servono a riconoscere i campi corretti a mano)
+    """
+    if parsed is None:
+        parsed = parse_event_text(full_text)
+    return {
+        'text': full_text,
+        'boxes': boxes or [],
+        'parser_version': PARSER_VERSION,
+        'parsed': {field: parsed.get(field, '') for field in FIELDS},
+    }
+
+
+def is_stale(event: Dict) -> bool:
+    """Vero se l'evento ha un testo OCR salvato analizzato con una versione vecchia del parser"""
+    ocr = event.get('ocr')
+    return bool(ocr and ocr.get('text')) and ocr.get('parser_version', 0) < PARSER_VERSION
+
+
+def reparse_event(event: Dict) -> List[str]:
+    """
+    Ri-estrae i campi dal testo OCR salvato, senza rifare l'OCR.
+    Un campo viene aggiornato solo se contiene ancora il valore estratto
+    automaticamente in precedenza: le correzioni manuali non vengono toccate.
+    Restituisce i nomi dei campi modificati.
+    """
+    ocr = event['ocr']
+    previous = ocr.get('parsed', {})
+    fresh = parse_event_text(ocr['text'])
+    changed = []
+    for field in FIELDS:
+        current = event.get(field, '')
+        if current == previous.get(field, current) and current != fresh[field]:
+            event[field] = fresh[field]
+            changed.append(field)
+    if 'date' in changed:
+        event['date_iso'] = fresh['date_iso'] or to_iso(event['date'])
+    ocr['parsed'] = {field: fresh[field] for field in FIELDS}
+    ocr['parser_version'] = PARSER_VERSION
+    return changed
+
+
+def reparse_events(events: List[Dict], force: bool = False) -> Dict[str, int]:
+    """
+    Ri-analizza in blocco tutti gli eventi con versione del parser obsoleta
+    (o tutti quelli con testo OCR se ``force``). Restituisce un riepilogo.
+    """
+    summary = {'checked': 0, 'reparsed': 0, 'updated': 0, 'fields': 0}
+    for event in events:
+        ocr = event.get('ocr')
+        if not ocr or not ocr.get('text'):
+            continue
+        summary['checked'] += 1
+        if not force and not is_stale(event):
+            continue
+        changed = reparse_event(event)
+        summary['reparsed'] += 1
+        if changed:
+            summary['updated'] += 1
+            summary['fields'] += len(changed)
+    return summary
+
@@ -0,0 +1,601 @@
+"""
+Archivio eventi su SQLite (modalità WAL) con salvataggi per singolo evento
+
+data.json resta il formato di scambio: viene importato al primo avvio (o dopo un
+ripristino) ed esportato prima dei backup.
+
+Più sessioni (e la riga di comando) possono scrivere insieme: ogni evento ha un numero
+di versione controllato al salvataggio (concorrenza ottimistica) e ogni modifica è
+registrata in un log con numero di revisione, da cui le sessioni leggono solo gli
+eventi cambiati.
+"""
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from date_utils import refresh_date_iso
+from event_model import Event
+from ocr_cache import file_sha256
+from phash import HammingIndex, NEAR_DUPLICATE_DISTANCE, image_dhash, parse_hash
+
+
+DATA_FILE = "data.json"
+DEFAULT_DB_PATH = os.environ.get("LOCANDINE_DB", "events.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    date_iso TEXT NOT NULL DEFAULT '',
+    location TEXT NOT NULL DEFAULT '',
+    image_path TEXT NOT NULL DEFAULT '',
+    image_hash TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_position ON events(position);
+CREATE INDEX IF NOT EXISTS idx_events_date_iso ON events(date_iso);
+CREATE INDEX IF NOT EXISTS idx_events_location ON events(location);
+CREATE INDEX IF NOT EXISTS idx_events_image_hash ON events(image_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    revision INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    op TEXT NOT NULL
+);
+"""
+
+# Operazioni del log che cambiano l'intero elenco: chi le trova deve ricaricare tutto
+_FULL_RELOAD_OPS = ('reorder', 'reset')
+# Voci del log conservate: chi è rimasto più indietro ricarica tutto
+CHANGES_KEPT = 5000
+
+
+class ConflictError(Exception):
+    """L'evento è stato modificato (o eliminato) da un'altra sessione dopo essere stato letto"""
+
+    def __init__(self, event_id: str, expected: int, current: Optional[int]):
+        state = f"ora alla versione {current}" if current is not None else "eliminato"
+        super().__init__(f"Evento {event_id} modificato da un'altra sessione "
+                         f"(letto alla versione {expected}, {state})")
+        self.event_id = event_id
+        self.expected = expected
+        self.current = current
+
+
+def new_event_id() -> str:
+    return uuid.uuid4().hex
+
+
+def normalize_event(event: Dict) -> Dict:
+    """Normalizzazioni fatte una volta sola all'ingresso nell'archivio (percorso con /, id, date_iso)"""
+    if 'image_path' in event:
+        event['image_path'] = event['image_path'].replace('\\', '/')
+    if not event.get('id'):
+        event['id'] = new_event_id()
+    if 'date_iso' not in event:
+        refresh_date_iso(event)
+    return event
+
+
+def image_hash(image_path: str) -> str:
+    """Hash del contenuto dell'immagine ('' se il file non esiste)"""
+    path = os.path.normpath(image_path) if image_path else ''
+    return file_sha256(path) if path and os.path.isfile(path) else ''
+
+
+def editable_copy(event, loaded_version: Optional[int]) -> Dict:
+    """
+    Copia modificabile di un evento da salvare dall'editor, con la versione su cui l'editor
+    ha caricato il modulo (non quella corrente): se nel frattempo un'altra sessione lo ha
+    salvato, ``upsert`` solleva ConflictError invece di sovrascriverlo.
+    """
+    data = event.to_dict() if isinstance(event, Event) else dict(event)
+    data['version'] = loaded_version
+    return data
+
+
+def edited_fields(loaded: Dict, form: Dict) -> List[str]:
+    """Campi del modulo con valori diversi da quelli con cui è stato caricato (modifiche non salvate)"""
+    return [field for field, value in form.items() if value != loaded.get(field, value)]
+
+
+class EventStore:
+    """
+    Eventi in una tabella SQLite: ogni modifica scrive solo la riga dell'evento, in una
+    transazione (un crash non lascia mai l'archivio troncato). Ogni riga contiene il
+    dizionario completo dell'evento in JSON più le colonne indicizzate (data ISO, luogo,
+    hash dell'immagine) e la posizione nell'elenco.
+    Una sola connessione, protetta da lock, condivisa dai thread delle sessioni.
+
+    Ogni evento ha una ``version`` (anche nel dizionario) che aumenta a ogni salvataggio:
+    salvare un evento letto a una versione ormai superata solleva ConflictError invece
+    di sovrascrivere le modifiche altrui. Le scritture usano BEGIN IMMEDIATE, che prende
+    subito il lock del database anche tra processi diversi.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, json_path: str = DATA_FILE):
+        self.db_path = db_path
+        self.json_path = json_path
+        self._lock = threading.RLock()
+        # Autocommit: le transazioni di scrittura sono aperte esplicitamente da _write()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}
+            if 'version' not in columns:  # Archivi creati prima delle versioni
+                self._conn.execute("ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+    @contextmanager
+    def _write(self):
+        """Transazione di scrittura (BEGIN IMMEDIATE): commit alla fine, rollback in caso di errore"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- LETTURA ---
+
+    @staticmethod
+    def _load(data: str, version: int) -> Dict:
+        event = json.loads(data)
+        event['version'] = version  # La colonna fa fede (archivi creati prima delle versioni)
+        return event
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def all(self) -> List[Dict]:
+        """Tutti gli eventi, nell'ordine dell'elenco"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data, version FROM events ORDER BY position").fetchall()
+        return [self._load(*row) for row in rows]
+
+    def get(self, event_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data, version FROM events WHERE id = ?", (event_id,)).fetchone()
+        return self._load(*row) if row else None
+
+    def _query(self, where: str, params: tuple) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data, version FROM events WHERE {where} ORDER BY position",
+                                      params).fetchall()
+        return [self._load(*row) for row in rows]
+
+    def by_date_range(self, start_iso: str, end_iso: str) -> List[Dict]:
+        """Eventi con data ISO in [start_iso, end_iso]"""
+        return self._query("date_iso BETWEEN ? AND ?", (start_iso, end_iso))
+
+    def by_location(self, location: str) -> List[Dict]:
+        return self._query("location = ?", (location.strip().upper(),))
+
+    def by_image_hash(self, content_hash: str) -> List[Dict]:
+        return self._query("image_hash = ?", (content_hash,))
+
+    def version(self, event_id: str) -> Optional[int]:
+        """Versione salvata dell'evento (None se non esiste)"""
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM events WHERE id = ?", (event_id,)).fetchone()
+        return row[0] if row else None
+
+    # --- NOTIFICHE DI MODIFICA ---
+
+    def revision(self) -> int:
+        """Revisione corrente dell'archivio: aumenta a ogni modifica salvata"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(revision), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, revision: int) -> Tuple[int, Optional[Set[str]]]:
+        """
+        Eventi modificati o eliminati dopo ``revision``: (revisione corrente, id cambiati).
+        Gli id sono None quando serve ricaricare tutto (riordino, sostituzione dell'archivio,
+        revisione troppo vecchia o sconosciuta).
+        """
+        with self._lock:
+            current, oldest = self._conn.execute(
+                "SELECT COALESCE(MAX(revision), 0), COALESCE(MIN(revision), 0) FROM changes").fetchone()
+            rows = self._conn.execute("SELECT event_id, op FROM changes WHERE revision > ? AND revision <= ?",
+                                      (revision, current)).fetchall()
+        if revision > current or revision < oldest - 1 or any(op in _FULL_RELOAD_OPS for _, op in rows):
+            return current, None
+        return current, {event_id for event_id, _ in rows}
+
+    def _log_changes(self, entries: Iterable[tuple]):
+        """Registra le modifiche (id evento, operazione) nella transazione corrente"""
+        cur = self._conn.executemany("INSERT INTO changes (event_id, op) VALUES (?, ?)", entries)
+        last = self._conn.execute("SELECT MAX(revision) FROM changes").fetchone()[0]
+        if cur.rowcount and last > CHANGES_KEPT:
+            self._conn.execute("DELETE FROM changes WHERE revision <= ?", (last - CHANGES_KEPT,))
+
+    # --- SCRITTURA ---
+
+    def _hash_images(self, events: List[Dict]) -> List[str]:
+        """
+        Calcola hash del contenuto ('' se il file manca) e hash percettivo delle immagini,
+        nell'ordine degli eventi, prima della transazione: leggere e decodificare i file
+        dentro BEGIN IMMEDIATE terrebbe il lock del database e le altre scritture
+        riceverebbero "database is locked".
+        """
+        hashes = []
+        for event in events:
+            normalize_event(event)
+            path = event.get('image_path', '')
+            previous_hash = event.get('image_hash')
+            with self._lock:
+                known = self._conn.execute("SELECT image_path, image_hash FROM events WHERE id = ?",
+                                           (event['id'],)).fetchone()
+            # L'hash dell'immagine si ricalcola solo se il percorso è cambiato
+            if known and known[0] == path and known[1]:
+                content_hash = known[1]
+            else:
+                content_hash = image_hash(path)
+            if content_hash:
+                event['image_hash'] = content_hash
+                # Hash percettivo calcolato una volta per immagine (o se il contenuto è cambiato)
+                if not event.get('phash') or (previous_hash and previous_hash != content_hash):
+                    perceptual = image_dhash(os.path.normpath(path))
+                    if perceptual:
+                        event['phash'] = perceptual
+                    else:
+                        event.pop('phash', None)
+            hashes.append(content_hash)
+        return hashes
+
+    @staticmethod
+    def _row(event: Dict, position: int, content_hash: str, version: int) -> tuple:
+        return (event['id'], position, event.get('date_iso', ''), event.get('location', '').strip().upper(),
+                event.get('image_path', ''), content_hash, version,
+                json.dumps(dict(event, version=version), ensure_ascii=False))
+
+    def _upsert_rows(self, events: List[Dict], hashes: List[str], force: bool = False) -> List[tuple]:
+        """
+        Scrive gli eventi nella transazione corrente e restituisce le coppie (evento, nuova
+        versione). ``hashes`` sono gli hash delle immagini calcolati prima con _hash_images.
+        La versione del dizionario va aggiornata solo dopo il commit: se la
+        transazione fallisce gli eventi restano alla versione letta.
+        """
+        cur = self._conn.execute("SELECT COALESCE(MAX(position), 0) FROM events")
+        next_position = cur.fetchone()[0] + 1
+        saved = []
+        for event, content_hash in zip(events, hashes):
+            existing = self._conn.execute(
+                "SELECT position, version FROM events WHERE id = ?", (event['id'],)
+            ).fetchone()
+            if existing:
+                position, current = existing
+                expected = event.get('version')
+                if not force and expected is not None and expected != current:
+                    raise ConflictError(event['id'], expected, current)
+                version = current + 1
+            else:
+                position, version = next_position, 1
+                next_position += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO events "
+                "(id, position, date_iso, location, image_path, image_hash, version, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._row(event, position, content_hash, version)
+            )
+            saved.append((event, version))
+        self._log_changes((event['id'], 'upsert') for event, _ in saved)
+        return saved
+
+    @staticmethod
+    def _set_versions(saved: List[tuple]):
+        for event, version in saved:
+            event['version'] = version
+
+    def upsert(self, event: Dict, force: bool = False) -> Dict:
+        """
+        Inserisce o aggiorna un evento (in coda se nuovo); assegna l'id se manca.
+        Se l'evento ha una ``version`` diversa da quella salvata solleva ConflictError,
+        salvo ``force`` (l'ultima scrittura vince).
+        """
+        hashes = self._hash_images([event])
+        with self._write():
+            saved = self._upsert_rows([event], hashes, force)
+        self._set_versions(saved)
+        return event
+
+    def upsert_many(self, events: Iterable[Dict], force: bool = False):
+        """Come upsert, per più eventi in un'unica transazione (un conflitto annulla tutto)"""
+        events = list(events)
+        hashes = self._hash_images(events)
+        with self._write():
+            saved = self._upsert_rows(events, hashes, force)
+        self._set_versions(saved)
+
+    def delete(self, event_id: str, version: Optional[int] = None) -> bool:
+        """Elimina l'evento; con ``version`` solo se nessuno lo ha modificato nel frattempo"""
+        with self._write():
+            current = self._conn.execute("SELECT version FROM events WHERE id = ?", (event_id,)).fetchone()
+            if current is None:
+                return False
+            if version is not None and version != current[0]:
+                raise ConflictError(event_id, version, current[0])
+            self._conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+            self._log_changes([(event_id, 'delete')])
+            return True
+
+    def reorder(self, event_ids: List[str]):
+        """Riassegna le posizioni secondo l'ordine indicato"""
+        with self._write():
+            self._conn.executemany("UPDATE events SET position = ? WHERE id = ?",
+                                   [(pos, event_id) for pos, event_id in enumerate(event_ids, start=1)])
+            self._log_changes([('', 'reorder')])
+
+    def replace_all(self, events: List[Dict]):
+        """Sostituisce l'intero archivio (import, reset) in un'unica transazione; le versioni ripartono da 1"""
+        hashes = self._hash_images(events)
+        with self._write():
+            self._conn.execute("DELETE FROM events")
+            saved = self._upsert_rows(events, hashes, force=True)
+            # Il log precedente non serve più: chi lo legge trova 'reset' e ricarica tutto
+            self._conn.execute("DELETE FROM changes")
+            self._log_changes([('', 'reset')])
+            # Da qui in poi l'archivio è la fonte dei dati: data.json non viene più importato da solo
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('initialized', '1')")
+        self._set_versions(saved)
+
+    # --- IMPORT / EXPORT data.json ---
+
+    def import_json(self, json_path: Optional[str] = None) -> int:
+        """Sostituisce l'archivio con il contenuto di data.json; restituisce il numero di eventi"""
+        json_path = json_path or self.json_path
+        with open(json_path, 'r', encoding='utf-8') as f:
+            events = json.load(f)
+        if not isinstance(events, list):
+            raise ValueError(f"{json_path}: atteso un elenco di eventi")
+        self.replace_all(events)
+        return len(events)
+
+    def export_json(self, json_path: Optional[str] = None) -> str:
+        """Scrive l'archivio nel formato di data.json (scrittura atomica)"""
+        json_path = json_path or self.json_path
+        tmp_path = f"{json_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.all(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, json_path)
+        return json_path
+
+    def ensure_imported(self) -> bool:
+        """Al primo avvio (archivio mai inizializzato) importa data.json se esiste"""
+        with self._lock:
+            initialized = self._conn.execute("SELECT 1 FROM meta WHERE key = 'initialized'").fetchone()
+        if initialized:
+            return False
+        if os.path.exists(self.json_path):
+            self.import_json()
+        else:
+            self.replace_all([])
+        return True
+
+
+_NO_DATE = '\uffff'  # Eventi senza data in fondo all'ordinamento
+
+
+class EventIndex:
+    """
+    Vista in memoria degli eventi con indici secondari aggiornati in modo incrementale:
+    per id, per percorso, hash e hash percettivo dell'immagine, per data ISO e per luogo,
+    più l'elenco ordinato per data (bisect). Accesso e controllo duplicati in O(1), inserimenti e
+    rimozioni dall'ordinamento in O(log N) per la ricerca.
+    L'ordine di inserimento (dict) è l'ordine dell'elenco, come in data.json.
+    ``revision`` è la revisione dell'archivio da cui è stata costruita (se nota).
+
+    Gli eventi sono tenuti come Event (i dizionari vengono convertiti all'ingresso):
+    ordinamento e indici usano i campi precalcolati.
+    """
+
+    def __init__(self, events: Iterable[Dict] = (), revision: Optional[int] = None):
+        self.revision = revision
+        self._by_id: Dict[str, Event] = {}
+        # id -> (chiave in _sorted, valori indicizzati): le modifiche in place all'evento
+        # non impediscono di rimuoverlo dagli indici in cui era stato inserito
+        self._entries: Dict[str, tuple] = {}
+        self._sorted: List[tuple] = []       # (date_iso, sequenza, id)
+        self._by_image: Dict[str, Set[str]] = {}
+        self._by_hash: Dict[str, Set[str]] = {}
+        self._by_date: Dict[str, Set[str]] = {}
+        self._by_location: Dict[str, Set[str]] = {}
+        self._by_phash = HammingIndex()      # Quasi-duplicati (distanza di Hamming)
+        self._seq = 0
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def copy(self) -> 'EventIndex':
+        """Copia degli indici che condivide i dizionari degli eventi (per il copy-on-write)"""
+        other = EventIndex.__new__(EventIndex)
+        other.revision = self.revision
+        other._by_id = dict(self._by_id)
+        other._entries = dict(self._entries)
+        other._sorted = list(self._sorted)
+        for name in ('_by_image', '_by_hash', '_by_date', '_by_location'):
+            setattr(other, name, {key: set(ids) for key, ids in getattr(self, name).items()})
+        other._by_phash = self._by_phash.copy()
+        other._seq = self._seq
+        return other
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._by_id
+
+    # --- AGGIORNAMENTO ---
+
+    def _postings(self, event: Event) -> tuple:
+        return ((self._by_image, event.image_key), (self._by_hash, event.image_hash),
+                (self._by_date, event.day_iso), (self._by_location, event.location_key))
+
+    def add(self, event: Dict):
+        """Aggiunge un evento in coda all'elenco (l'evento deve avere un id)"""
+        event = Event.from_dict(event)
+        event_id = event.id
+        if event_id in self._entries:
+            self.update(event)
+            return
+        self._by_id[event_id] = event
+        self._seq += 1
+        self._index(event, self._seq)
+
+    def _index(self, event: Event, seq: int):
+        event_id = event.id
+        key = (event.day_iso or _NO_DATE, seq, event_id)
+        postings = self._postings(event)
+        self._entries[event_id] = (key, postings)
+        bisect.insort(self._sorted, key)
+        for index, value in postings:
+            if value:
+                index.setdefault(value, set()).add(event_id)
+        if event.phash_value is not None:
+            self._by_phash.add(event_id, event.phash_value)
+
+    def _unindex(self, event_id: str) -> int:
+        key, postings = self._entries.pop(event_id)
+        pos = bisect.bisect_left(self._sorted, key)
+        del self._sorted[pos]
+        for index, value in postings:
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del index[value]
+        self._by_phash.discard(event_id)
+        return key[1]
+
+    def update(self, event: Dict):
+        """Sostituisce e reindicizza un evento modificato, mantenendone la posizione nell'elenco"""
+        event = Event.from_dict(event)
+        event_id = event.id
+        if event_id not in self._entries:
+            self.add(event)
+            return
+        seq = self._unindex(event_id)
+        self._by_id[event_id] = event
+        self._index(event, seq)
+
+    def remove(self, event_id: str) -> Optional[Event]:
+        if event_id not in self._by_id:
+            return None
+        self._unindex(event_id)
+        return self._by_id.pop(event_id)
+
+    # --- LETTURA ---
+
+    def get(self, event_id: str) -> Optional[Event]:
+        return self._by_id.get(event_id)
+
+    def events(self) -> List[Event]:
+        """Eventi nell'ordine dell'elenco"""
+        return list(self._by_id.values())
+
+    def sorted_by_date(self) -> List[Event]:
+        """Eventi in ordine cronologico (senza data in fondo; a parità di data, ordine dell'elenco)"""
+        return [self._by_id[event_id] for _, _, event_id in self._sorted]
+
+    def between(self, start_iso: str, end_iso: str) -> List[Event]:
+        """Eventi con data ISO in [start_iso, end_iso], in ordine cronologico (ricerca binaria)"""
+        lo = bisect.bisect_left(self._sorted, (start_iso,))
+        hi = bisect.bisect_right(self._sorted, (end_iso, float('inf')))
+        return [self._by_id[event_id] for _, _, event_id in self._sorted[lo:hi]]
+
+    def by_image(self, image_path: str) -> List[Event]:
+        return [self._by_id[i] for i in self._by_image.get(image_path.strip(), ())]
+
+    def by_hash(self, content_hash: str) -> List[Event]:
+        return [self._by_id[i] for i in self._by_hash.get(content_hash, ())]
+
+    def by_date(self, date_iso: str) -> List[Event]:
+        return [self._by_id[i] for i in self._by_date.get(date_iso, ())]
+
+    def by_location(self, location: str) -> List[Event]:
+        return [self._by_id[i] for i in self._by_location.get(location.strip().upper(), ())]
+
+    def duplicate_images(self) -> Dict[str, List[Event]]:
+        """Immagini usate da più eventi (stesso percorso o stesso contenuto): chiave -> eventi"""
+        groups = {path: ids for path, ids in self._by_image.items() if len(ids) > 1}
+        seen = {frozenset(ids) for ids in groups.values()}
+        for content_hash, ids in self._by_hash.items():
+            if len(ids) > 1 and frozenset(ids) not in seen:
+                groups[f"sha256:{content_hash[:12]}"] = ids
+        return {key: [self._by_id[i] for i in ids] for key, ids in groups.items()}
+
+    def near_duplicates(self, phash, max_distance: int = NEAR_DUPLICATE_DISTANCE,
+                        exclude: Iterable[str] = ()) -> List[tuple]:
+        """
+        Eventi con immagine percettivamente simile (stessa locandina ricompressa, ridimensionata,
+        screenshot) come (bit diversi, evento), dal più simile. ``phash`` in esadecimale o intero.
+        """
+        value = parse_hash(phash) if isinstance(phash, str) else phash
+        if value is None:
+            return []
+        excluded = set(exclude)
+        matches = self._by_phash.search(value, max_distance)
+        return [(distance, self._by_id[event_id]) for distance, event_id in matches if event_id not in excluded]
+
+    def is_duplicate(self, event: Event) -> bool:
+        """Vero se l'immagine dell'evento è condivisa con altri eventi"""
+        return (len(self._by_image.get(event.image_key, ())) > 1
+                or len(self._by_hash.get(event.image_hash, ())) > 1)
+
+
+class EventCache:
+    """
+    Elenco degli eventi condiviso da tutto il processo: le sessioni leggono la stessa
+    istantanea (EventIndex) invece di tenerne ognuna una copia.
+
+    L'istantanea è legata alla revisione dell'archivio. Quando l'archivio cambia se ne
+    pubblica una nuova (copy-on-write), rileggendo solo gli eventi cambiati; quella vecchia
+    resta valida per chi la sta già usando. Le istantanee non si modificano mai: per
+    cambiare un evento se ne salva una copia nell'archivio.
+    """
+
+    def __init__(self, store: EventStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._snapshot: Optional[EventIndex] = None
+
+    def snapshot(self) -> EventIndex:
+        """Istantanea allineata all'ultima revisione dell'archivio"""
+        current = self._snapshot
+        if current is not None and current.revision == self.store.revision():
+            return current
+        with self._lock:
+            current = self._snapshot
+            if current is None:
+                changed = None
+            else:
+                revision, changed = self.store.changes_since(current.revision)
+            if changed is None:
+                revision = self.store.revision()  # Letta prima degli eventi: nessuna modifica persa
+                snapshot = EventIndex(self.store.all(), revision)
+            else:
+                snapshot = current.copy()
+                snapshot.revision = revision
+                for event_id in changed:
+                    event = self.store.get(event_id)
+                    if event is None:
+                        snapshot.remove(event_id)
+                    else:
+                        snapshot.update(event)
+            self._snapshot = snapshot
+            return snapshot
@@ -3,11 +3,11 @@ import zipfile
 import io
 import json
 from datetime import datetime
-from github import Github, Auth
-import streamlit as st
 
 class GithubManager:
     def __init__(self, token, repo_name):
+        # PyGithub viene importato solo quando serve davvero (backup/ripristino configurati)
+        from github import Github, Auth
         self.auth = Auth.Token(token)
         # Aumentiamo il timeout a 120 secondi per gestire file più pesanti
         self.g = Github(auth=self.auth, timeout=120)
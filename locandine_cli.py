@@ -0,0 +1,331 @@
+"""
+Pipeline da riga di comando (senza Streamlit né tkinter): acquisizione locandine,
+OCR in parallelo, unione in data.json ed esportazione Word
+
+Uso:
+    python locandine_cli.py ingest CARTELLA [--uploads uploads]
+    python locandine_cli.py ocr [IMMAGINI...] [--all] [--workers 4] [--results output/ocr_results.json]
+    python locandine_cli.py merge [--results output/ocr_results.json]
+    python locandine_cli.py export [--out output/Eventi.docx] [--mode minimal]
+    python locandine_cli.py reparse [--force]   # ri-analizza i testi OCR salvati col parser attuale
+    python locandine_cli.py run CARTELLA [--out output/Eventi.docx]   # tutte le fasi in sequenza
+
+Gli eventi sono letti e salvati nell'archivio SQLite (--db, come l'app); dopo un merge
+o un reparse viene riscritto anche data.json.
+
+Codici di uscita: 0 ok, 1 errore bloccante, 3 completato con errori su alcune locandine.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from date_utils import refresh_date_iso
+from event_parser import is_stale, make_ocr_record, parse_event_text, reparse_events
+from event_store import DEFAULT_DB_PATH, EventStore
+from upload_store import UploadStore
+
+
+DATA_FILE = "data.json"
+UPLOADS_DIR = "uploads"
+OUTPUT_DIR = "output"
+DEFAULT_RESULTS = os.path.join(OUTPUT_DIR, "ocr_results.json")
+DEFAULT_DOCX = os.path.join(OUTPUT_DIR, "Eventi.docx")
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_PARTIAL = 3
+
+
+class CLIError(Exception):
+    """Errore bloccante: il comando termina con EXIT_ERROR"""
+
+
+# --- FILE ---
+
+def load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError as e:
+            raise CLIError(f"{path} non è un JSON valido: {e}")
+
+
+def save_json(path: str, data):
+    """Scrittura atomica: un job interrotto non lascia mai un file troncato"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def list_images(folder: str) -> List[str]:
+    if not os.path.isdir(folder):
+        raise CLIError(f"Cartella non trovata: {folder}")
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def to_upload_path(path: str, uploads_dir: str = UPLOADS_DIR) -> str:
+    """Percorso immagine nel formato di data.json (``uploads/nome``, sempre con /)"""
+    return f"{uploads_dir}/{os.path.basename(path)}"
+
+
+# --- FASI ---
+
+def ingest(folder: str, uploads_dir: str = UPLOADS_DIR) -> Dict[str, List[str]]:
+    """
+    Salva le locandine della cartella nell'archivio per contenuto di uploads (come l'app):
+    un contenuto già presente, anche con un altro nome, viene saltato.
+    """
+    uploads = UploadStore(uploads_dir)
+    summary = {'copied': [], 'skipped': []}
+    for src in list_images(folder):
+        with open(src, 'rb') as f:
+            stored = uploads.put(os.path.basename(src), f.read())
+        summary['copied' if stored['stored'] else 'skipped'].append(stored['path'])
+    return summary
+
+
+def pending_images(uploads_dir: str, events: List[Dict]) -> List[str]:
+    """Immagini di uploads non ancora associate a un evento di data.json"""
+    known = {ev.get('image_path', '').replace('\\', '/') for ev in events}
+    return [path for path in list_images(uploads_dir) if to_upload_path(path, uploads_dir) not in known]
+
+
+def event_from_ocr(raw_ocr: Dict, image_path: str) -> Dict:
+    """Evento pronto per data.json dal risultato di analyze_poster (come il salvataggio del Tab 1)"""
+    raw_text = raw_ocr.get('full_text', '')
+    parsed = parse_event_text(raw_text)
+    event = {
+        'title': parsed['title'], 'date': parsed['date'], 'time': parsed['time'],
+        'location': parsed['location'], 'venue': parsed['venue'], 'address': parsed['address'],
+        'description': parsed['description'], 'image_path': image_path,
+        'added_on': datetime.now().strftime('%Y-%m-%d'),
+        'is_new': True,
+        'ocr': make_ocr_record(raw_text, raw_ocr.get('boxes'), parsed),
+    }
+    refresh_date_iso(event)
+    return event
+
+
+def run_ocr(images: List[str], workers: int, roi_first: bool = False, use_cache: bool = True,
+            uploads_dir: str = UPLOADS_DIR, log=print) -> Dict:
+    """OCR e parsing in parallelo (batch_ocr); restituisce eventi pronti ed errori per immagine"""
+    from batch_ocr import iter_analyze_posters
+
+    results = {'created_at': datetime.now().isoformat(timespec='seconds'), 'events': [], 'errors': {}}
+    start = time.perf_counter()
+    for done, (path, raw_ocr, error) in enumerate(
+            iter_analyze_posters(images, workers=workers, use_cache=use_cache, roi_first=roi_first), start=1):
+        name = os.path.basename(path)
+        if error:
+            results['errors'][to_upload_path(path, uploads_dir)] = error
+            log(f"  [{done}/{len(images)}] ERRORE {name}: {error}")
+        else:
+            results['events'].append(event_from_ocr(raw_ocr, to_upload_path(path, uploads_dir)))
+            log(f"  [{done}/{len(images)}] {name}")
+    results['seconds'] = round(time.perf_counter() - start, 2)
+    return results
+
+
+def merge(events: List[Dict], new_events: List[Dict], replace: bool = False) -> Dict[str, int]:
+    """
+    Aggiunge a ``events`` (in place) gli eventi nuovi; quelli di un'immagine già presente
+    sono saltati, oppure sostituiti con ``replace`` (mantenendo l'id dell'evento).
+    Nel riepilogo, ``changed`` sono gli eventi da salvare.
+    """
+    by_image = {ev.get('image_path', '').replace('\\', '/'): idx for idx, ev in enumerate(events)}
+    summary = {'added': 0, 'replaced': 0, 'skipped': 0, 'changed': []}
+    for event in new_events:
+        idx = by_image.get(event['image_path'])
+        if idx is None:
+            by_image[event['image_path']] = len(events)
+            events.append(event)
+            summary['added'] += 1
+        elif replace:
+            if events[idx].get('id'):
+                event['id'] = events[idx]['id']
+            events[idx] = event
+            summary['replaced'] += 1
+        else:
+            summary['skipped'] += 1
+            continue
+        summary['changed'].append(event)
+    return summary
+
+
+def export(events: List[Dict], out_path: str, mode: str = "standard", show_borders: bool = True) -> str:
+    from word_generator import WordGenerator
+
+    if not events:
+        raise CLIError("Nessun evento da esportare")
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    return WordGenerator().generate_from_data(events, out_path, mode=mode, show_borders=show_borders)
+
+
+# --- COMANDI ---
+
+def open_store(args) -> EventStore:
+    """Archivio eventi (importa data.json al primo utilizzo, come l'app)"""
+    store = EventStore(args.db, json_path=args.data)
+    store.ensure_imported()
+    return store
+
+
+def cmd_ingest(args) -> int:
+    summary = ingest(args.folder, args.uploads)
+    print(f"Copiate {len(summary['copied'])} locandine in {args.uploads} "
+          f"({len(summary['skipped'])} già presenti)")
+    return EXIT_OK
+
+
+def _select_images(args, events: List[Dict]) -> List[str]:
+    if args.images:
+        missing = [path for path in args.images if not os.path.isfile(path)]
+        if missing:
+            raise CLIError(f"Immagini non trovate: {', '.join(missing)}")
+        return args.images
+    return list_images(args.uploads) if args.all else pending_images(args.uploads, events)
+
+
+def cmd_ocr(args) -> int:
+    images = _select_images(args, open_store(args).all())
+    if not images:
+        print("Nessuna locandina da analizzare")
+        save_json(args.out_results, {'created_at': datetime.now().isoformat(timespec='seconds'), 'events': [], 'errors': {}})
+        return EXIT_OK
+    print(f"OCR di {len(images)} locandine con {args.workers} processi...")
+    results = run_ocr(images, args.workers, args.roi_first, not args.no_cache, args.uploads)
+    save_json(args.out_results, results)
+    print(f"Analizzate {len(results['events'])}/{len(images)} in {results['seconds']}s -> {args.out_results}")
+    return EXIT_PARTIAL if results['errors'] else EXIT_OK
+
+
+def cmd_merge(args) -> int:
+    if not os.path.exists(args.out_results):
+        raise CLIError(f"Risultati OCR non trovati: {args.out_results} (eseguire prima 'ocr')")
+    results = load_json(args.out_results, {})
+    store = open_store(args)
+    events = store.all()
+    summary = merge(events, results.get('events', []), replace=args.replace)
+    if summary['changed']:
+        store.upsert_many(summary['changed'])
+        store.export_json()  # data.json allineato per backup e strumenti esterni
+    print(f"Archivio: {summary['added']} aggiunti, {summary['replaced']} sostituiti, "
+          f"{summary['skipped']} già presenti ({len(events)} eventi totali)")
+    return EXIT_PARTIAL if results.get('errors') else EXIT_OK
+
+
+def cmd_reparse(args) -> int:
+    store = open_store(args)
+    events = [ev for ev in store.all() if (ev.get('ocr') or {}).get('text') and (args.force or is_stale(ev))]
+    summary = reparse_events(events, force=True)
+    if events:
+        store.upsert_many(events)
+        store.export_json()
+    print(f"Eventi ri-analizzati: {summary['reparsed']}, aggiornati: {summary['updated']} "
+          f"({summary['fields']} campi)")
+    return EXIT_OK
+
+
+def cmd_export(args) -> int:
+    events = open_store(args).all()
+    out_path = export(events, args.out, args.mode, not args.no_borders)
+    print(f"Documento Word con {len(events)} eventi: {out_path}")
+    return EXIT_OK
+
+
+def cmd_run(args) -> int:
+    status = cmd_ingest(args)
+    for step in (cmd_ocr, cmd_merge, cmd_export):
+        status = max(status, step(args))
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Locandine2Word da riga di comando")
+    parser.add_argument('--data', default=DATA_FILE, help=f"Eventi in formato JSON (default: {DATA_FILE})")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f"Archivio SQLite (default: {DEFAULT_DB_PATH})")
+    parser.add_argument('--uploads', default=UPLOADS_DIR, help=f"Cartella immagini (default: {UPLOADS_DIR})")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_ocr_options(p):
+        from batch_ocr import DEFAULT_WORKERS
+        p.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help=f"Processi OCR paralleli (default: {DEFAULT_WORKERS})")
+        p.add_argument('--roi-first', action='store_true', help="Legge prima le fasce di intestazione")
+        p.add_argument('--no-cache', action='store_true', help="Ignora la cache OCR su disco")
+        p.add_argument('--results', dest='out_results', default=DEFAULT_RESULTS,
+                       help=f"File dei risultati OCR (default: {DEFAULT_RESULTS})")
+
+    def add_export_options(p):
+        p.add_argument('--mode', choices=['standard', 'minimal'], default='standard', help="Stile del documento")
+        p.add_argument('--no-borders', action='store_true', help="Tabelle senza bordi")
+
+    p = sub.add_parser('ingest', help="Copia le locandine di una cartella in uploads")
+    p.add_argument('folder', help="Cartella con le immagini")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser('ocr', help="OCR e parsing in parallelo delle locandine non ancora in archivio")
+    p.add_argument('images', nargs='*', help="Immagini di uploads da analizzare (default: quelle in attesa)")
+    p.add_argument('--all', action='store_true', help="Analizza tutte le immagini di uploads")
+    add_ocr_options(p)
+    p.set_defaults(func=cmd_ocr)
+
+    p = sub.add_parser('merge', help="Unisce i risultati OCR all'archivio eventi")
+    p.add_argument('--results', dest='out_results', default=DEFAULT_RESULTS,
+                   help=f"File dei risultati OCR (default: {DEFAULT_RESULTS})")
+    p.add_argument('--replace', action='store_true', help="Sostituisce gli eventi delle immagini già presenti")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('reparse', help="Ri-analizza i testi OCR salvati con la versione attuale del parser")
+    p.add_argument('--force', action='store_true', help="Ri-analizza anche gli eventi già aggiornati")
+    p.set_defaults(func=cmd_reparse)
+
+    p = sub.add_parser('export', help="Genera il documento Word da data.json")
+    p.add_argument('--out', default=DEFAULT_DOCX, help=f"File .docx (default: {DEFAULT_DOCX})")
+    add_export_options(p)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('run', help="ingest + ocr + merge + export")
+    p.add_argument('folder', help="Cartella con le immagini")
+    p.add_argument('--out', default=DEFAULT_DOCX, help=f"File .docx (default: {DEFAULT_DOCX})")
+    p.add_argument('--replace', action='store_true', help="Sostituisce gli eventi delle immagini già presenti")
+    add_ocr_options(p)
+    add_export_options(p)
+    p.set_defaults(func=cmd_run, images=[], all=False)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except CLIError as e:
+        print(f"Errore: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    except ImportError as e:
+        print(f"Errore: dipendenza mancante ({e}), installare requirements.txt", file=sys.stderr)
+        return EXIT_ERROR
+    except KeyboardInterrupt:
+        print("Interrotto", file=sys.stderr)
+        return EXIT_ERROR
+    except Exception as e:
+        # Qualsiasi altro errore (pool OCR interrotto, archivio, disco): una riga e codice
+        # di uscita prevedibile per i job notturni, senza traceback
+        print(f"Errore: {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Cache persistente su disco dei risultati OCR, indicizzata per contenuto dell'immagine
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_CACHE_DIR = os.environ.get("LOCANDINE_OCR_CACHE", ".ocr_cache")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+
+
+def file_sha256(image_path: str) -> str:
+    """Hash SHA-256 del contenuto del file (indipendente dal nome)"""
+    h = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _to_builtin(value):
+    """Converte tipi numpy (int32, float64, array) in tipi JSON nativi"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    return value
+
+
+class OCRCache:
+    """
+    Cache LRU su disco dei risultati di ``easyocr.Reader.readtext``.
+
+    La chiave combina l'hash del contenuto dell'immagine, le lingue del reader e la
+    versione del motore: la stessa locandina ricaricata con un altro nome viene
+    riconosciuta, mentre un aggiornamento di easyocr invalida le voci vecchie.
+    Ogni voce è un file JSON; l'ultimo accesso è tracciato dal mtime del file e,
+    superata la dimensione massima, vengono eliminate le voci usate meno di recente.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Calcolato pigramente alla prima scrittura
+
+    @staticmethod
+    def make_key(content_hash: str, languages: Sequence[str], engine_version: str, extra: str = "") -> str:
+        """Chiave della voce: hash contenuto + lingue + versione motore (+ parametri extra)"""
+        raw = "|".join([content_hash, ",".join(languages), engine_version, extra])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[tuple]]:
+        """Restituisce i risultati in formato readtext ``[(box, testo, confidenza), ...]`` o None"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[List[tuple], Dict]]:
+        """Come get, ma restituisce la coppia (risultati, metadati)"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # Aggiorna l'ultimo accesso per la politica LRU
+        except (OSError, ValueError):
+            return None
+        results = [(item['box'], item['text'], item['confidence']) for item in entry.get('results', [])]
+        return results, entry.get('meta', {})
+
+    def put(self, key: str, results: List[tuple], meta: Optional[Dict] = None):
+        """Salva i risultati grezzi di readtext (box, testo, confidenza)"""
+        entry = {
+            'key': key,
+            'meta': meta or {},
+            'results': [
+                {'box': _to_builtin(box), 'text': text, 'confidence': float(conf)}
+                for box, text, conf in results
+            ],
+        }
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Scrittura atomica: niente voci troncate
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += os.path.getsize(path)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _list_entries(self) -> List[tuple]:
+        """Elenca le voci come (mtime, dimensione, percorso)"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._list_entries())
+
+    def _evict(self):
+        """Elimina le voci meno recenti fino a scendere sotto il 90% del limite"""
+        entries = sorted(self._list_entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def clear(self):
+        """Svuota completamente la cache"""
+        with self._lock:
+            for _, _, path in self._list_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
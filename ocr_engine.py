@@ -1,22 +1,534 @@
 """
 OCR Engine per l'estrazione automatica di informazioni dalle locandine
+
+easyocr/torch, numpy e PIL sono importati solo al primo utilizzo: il parsing del
+testo (analyze_from_text, parse_event_text) non ne paga il costo di import.
 """
-import easyocr
+from __future__ import annotations
+
+import functools
+import os
 import re
+import sys
+import threading
+import time
 from datetime import datetime
-import dateparser
-from typing import Dict, Optional, List
-import numpy as np
+from date_utils import parse_italian_date
+from event_parser import parse_event_text
+from typing import TYPE_CHECKING, Dict, Optional, List, Sequence, Tuple
+from ocr_cache import OCRCache, DEFAULT_CACHE_DIR, file_sha256
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+
+OCR_LANGUAGES = ['it', 'en']
+# Incrementare quando cambia il modo in cui viene invocato readtext
+OCR_PIPELINE_VERSION = "8"
+# Lato massimo (px) dell'immagine passata all'OCR; 0 disattiva il ridimensionamento
+DEFAULT_MAX_SIDE = int(os.environ.get("LOCANDINE_OCR_MAX_SIDE", 2000))
+# Oltre questa soglia di pixel dell'immagine sorgente l'OCR procede a tasselli, con
+# l'immagine ridotta a questa area invece che a DEFAULT_MAX_SIDE
+DEFAULT_TILE_THRESHOLD_PX = int(os.environ.get("LOCANDINE_OCR_TILE_THRESHOLD", 12_000_000))
+DEFAULT_TILE_SIZE = 1600
+DEFAULT_TILE_OVERLAP = 200
+# Regioni di interesse per l'OCR con uscita anticipata (frazioni dell'altezza)
+ROI_TOP_FRACTION = 0.35
+ROI_BOTTOM_FRACTION = 0.2
+ROI_OVERLAP = 0.03
+# Caratteri uguali minimi per eliminare la ripetizione tra due frammenti uniti
+MIN_JOIN_OVERLAP = 3
+# Indirizzo del servizio OCR locale (vedi ocr_server.py); se impostato i modelli non vengono caricati qui
+DEFAULT_SERVER_ADDRESS = os.environ.get("LOCANDINE_OCR_SERVER") or None
+
+# Backend di inferenza: 'stock' è il reader predefinito di EasyOCR, che su CPU quantizza già
+# in int8 (dinamicamente) LSTM e Linear dei modelli; 'float32' (a richiesta) è lo stesso reader
+# senza quantizzazione, come riferimento di accuratezza nei confronti di bench_ocr.py.
+# 'int8' è accettato come sinonimo di 'stock'.
+OCR_BACKENDS = ('stock', 'float32')
+BACKEND_ALIASES = {'int8': 'stock'}
+DEFAULT_BACKEND = os.environ.get("LOCANDINE_OCR_BACKEND", "stock")
+
+# --- READER CONDIVISO A LIVELLO DI PROCESSO ---
+# I modelli EasyOCR occupano centinaia di MB: ne carichiamo una sola copia per processo
+# (per backend), condivisa da tutte le istanze di LocandineOCR e quindi da tutte le sessioni.
+_shared_readers = {}
+_shared_reader_error = None
+_shared_reader_lock = threading.Lock()
+_warmup_thread = None
+# Serializza l'inferenza: più sessioni in parallelo si contenderebbero solo gli stessi core
+_inference_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def easyocr_version() -> str:
+    """Versione di easyocr installata, letta dai metadati se il pacchetto non è ancora importato"""
+    module = sys.modules.get('easyocr')
+    if module is not None:
+        return getattr(module, '__version__', 'unknown')
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version('easyocr')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def _create_reader(backend: str):
+    import easyocr
+    reader = easyocr.Reader(OCR_LANGUAGES, gpu=False, quantize=backend != 'float32')
+    reader.locandine_backend = backend
+    return reader
+
+
+def resolve_backend(backend: Optional[str]) -> str:
+    """Nome canonico del backend (default: LOCANDINE_OCR_BACKEND); ValueError se sconosciuto"""
+    backend = backend or DEFAULT_BACKEND
+    backend = BACKEND_ALIASES.get(backend, backend)
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Backend OCR sconosciuto: {backend} (validi: {', '.join(OCR_BACKENDS)})")
+    return backend
+
+
+def get_shared_reader(backend: Optional[str] = None):
+    """Restituisce il reader EasyOCR del processo per il backend indicato, creandolo al primo utilizzo"""
+    global _shared_reader_error
+    backend = resolve_backend(backend)
+    reader = _shared_readers.get(backend)
+    if reader is None:
+        with _shared_reader_lock:
+            reader = _shared_readers.get(backend)
+            if reader is None:
+                try:
+                    reader = _create_reader(backend)
+                    _shared_readers[backend] = reader
+                    _shared_reader_error = None
+                except Exception as e:
+                    _shared_reader_error = e
+                    raise
+    return reader
+
+
+def warm_up_shared_reader() -> threading.Thread:
+    """
+    Avvia (una sola volta) il caricamento dei modelli in un thread in background,
+    così la prima analisi non paga il tempo di inizializzazione
+    """
+    global _warmup_thread
+    with _shared_reader_lock:
+        if _warmup_thread is None:
+            def _load():
+                try:
+                    get_shared_reader()
+                except Exception:
+                    pass  # L'errore resta in _shared_reader_error
+            _warmup_thread = threading.Thread(target=_load, name="ocr-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def shared_reader_status() -> str:
+    """Stato del reader condiviso: 'ready', 'loading', 'error' oppure 'idle'"""
+    if DEFAULT_BACKEND in _shared_readers:
+        return 'ready'
+    if _shared_reader_error is not None:
+        return 'error'
+    if _warmup_thread is not None and _warmup_thread.is_alive():
+        return 'loading'
+    return 'idle'
+
+
+class ImagePreprocessor:
+    """
+    Prepara l'immagine prima dell'OCR: corregge l'orientamento EXIF, riduce il lato
+    maggiore a ``max_side`` pixel e opzionalmente converte in scala di grigi e
+    normalizza il contrasto. Le foto da telefono (4000px e oltre) vengono così
+    analizzate a una risoluzione più che sufficiente per volantini A4/A3.
+    """
+
+    def __init__(self, max_side: Optional[int] = DEFAULT_MAX_SIDE, grayscale: bool = False,
+                 normalize_contrast: bool = False, fix_orientation: bool = True):
+        self.max_side = max_side
+        self.grayscale = grayscale
+        self.normalize_contrast = normalize_contrast
+        self.fix_orientation = fix_orientation
+
+    def config_key(self) -> str:
+        """Identifica la configurazione (entra nella chiave della cache OCR)"""
+        return (f"max{self.max_side or 0}-g{int(self.grayscale)}"
+                f"-c{int(self.normalize_contrast)}-o{int(self.fix_orientation)}")
+
+    @staticmethod
+    def source_pixels(image_path: str) -> int:
+        """Pixel dell'immagine sorgente, letti dall'intestazione senza decodificarla"""
+        from PIL import Image
+        with Image.open(image_path) as img:
+            return img.width * img.height
+
+    def _reduction(self, size: Tuple[int, int], max_pixels: Optional[int]) -> Optional[float]:
+        """Fattore di riduzione da applicare (None se l'immagine va bene così)"""
+        if max_pixels:
+            pixels = size[0] * size[1]
+            return (max_pixels / pixels) ** 0.5 if pixels > max_pixels else None
+        if self.max_side and max(size) > self.max_side:
+            return self.max_side / max(size)
+        return None
+
+    def load(self, image_path: str, max_pixels: Optional[int] = None) -> Tuple[Image.Image, Dict]:
+        """
+        Apre e trasforma l'immagine, restituendo l'immagine PIL e il report delle modifiche.
+        Con ``max_pixels`` (OCR a tasselli) l'immagine è ridotta a quell'area invece che a max_side.
+        """
+        from PIL import Image, ImageOps
+        with Image.open(image_path) as img:
+            original_size = img.size
+            ratio = self._reduction(img.size, max_pixels)
+            if ratio:
+                # Per i JPEG decodifica direttamente a risoluzione ridotta (meno RAM e CPU)
+                img.draft(img.mode, (int(img.width * ratio), int(img.height * ratio)))
+            img.load()
+
+            # Dimensione di riferimento per le coordinate dei box: originale ma già orientata
+            reference_size = original_size
+            rotated = False
+            if self.fix_orientation:
+                orientation = img.getexif().get(0x0112, 1)
+                if orientation not in (1, None):
+                    img = ImageOps.exif_transpose(img)
+                    rotated = True
+                    if orientation in (5, 6, 7, 8):  # Rotazioni di 90°: lati scambiati
+                        reference_size = (original_size[1], original_size[0])
+
+            ratio = self._reduction(img.size, max_pixels)
+            if ratio:
+                img = img.resize((max(1, round(img.width * ratio)), max(1, round(img.height * ratio))),
+                                 Image.LANCZOS)
+
+            img = img.convert('L' if self.grayscale else 'RGB')
+            if self.normalize_contrast:
+                img = ImageOps.autocontrast(img, cutoff=1)
+
+        scale = img.width / reference_size[0] if reference_size[0] else 1.0
+        original_px = original_size[0] * original_size[1]
+        report = {
+            'original_size': list(original_size),
+            'processed_size': list(img.size),
+            'scale': scale,
+            'rotated': rotated,
+            'grayscale': self.grayscale,
+            'contrast_normalized': self.normalize_contrast,
+            'pixel_reduction': round(1 - (img.width * img.height) / original_px, 4) if original_px else 0.0,
+        }
+        return img, report
+
+    def process(self, image_path: str, max_pixels: Optional[int] = None) -> Tuple[np.ndarray, Dict]:
+        """Restituisce l'array pronto per readtext (BGR o grigio, come si aspetta EasyOCR) e il report"""
+        import numpy as np
+        img, report = self.load(image_path, max_pixels)
+        arr = np.asarray(img)
+        if arr.ndim == 3:
+            arr = np.ascontiguousarray(arr[:, :, ::-1])  # RGB -> BGR
+        return arr, report
+
+
+def rescale_boxes(results: List[tuple], scale: float) -> List[tuple]:
+    """Riporta i box di readtext dalle coordinate dell'immagine ridotta a quelle originali"""
+    if not scale or scale == 1.0:
+        return results
+    return [
+        ([[float(x) / scale, float(y) / scale] for x, y in box], text, conf)
+        for box, text, conf in results
+    ]
+
+
+def _bbox(box) -> Tuple[float, float, float, float]:
+    """Rettangolo (x0, y0, x1, y1) che contiene il quadrilatero di readtext"""
+    xs = [float(p[0]) for p in box]
+    ys = [float(p[1]) for p in box]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _area(r) -> float:
+    return max(0.0, r[2] - r[0]) * max(0.0, r[3] - r[1])
+
+
+def _intersection(a, b) -> float:
+    return _area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def _join_overlapping_text(left: str, right: str) -> str:
+    """
+    Unisce due frammenti tagliati su un bordo, eliminando la parte ripetuta nella sovrapposizione.
+    Servono almeno MIN_JOIN_OVERLAP caratteri uguali: una sola lettera in comune è un caso
+    ("ROMA" + "ALFA"), non una ripetizione.
+    """
+    for n in range(min(len(left), len(right)), MIN_JOIN_OVERLAP - 1, -1):
+        if left[-n:].lower() == right[:n].lower():
+            return left + right[n:]
+    return f"{left} {right}"
+
+
+def _seams_hit(rect, seams) -> set:
+    """Indici delle fasce di sovrapposizione (x0, y0, x1, y1) toccate dal rettangolo"""
+    return {i for i, seam in enumerate(seams) if _intersection(rect, seam)}
+
+
+def merge_tile_results(results: List[tuple], sources: Optional[List[int]] = None,
+                       seams: Sequence[Tuple[float, float, float, float]] = ()) -> List[tuple]:
+    """
+    Fonde i risultati dei singoli tasselli (o fasce ROI): le scritte lette due volte nella fascia
+    di sovrapposizione vengono deduplicate (si tiene il box più completo) e i frammenti
+    della stessa riga tagliati da un bordo vengono riuniti in un unico box.
+    ``sources`` indica per ogni risultato il tassello da cui viene: box dello stesso tassello
+    non si fondono mai. Si uniscono solo frammenti che toccano la stessa fascia di
+    sovrapposizione tra tasselli (``seams``).
+    """
+    if sources is None:
+        sources = range(len(results))
+    items = sorted(
+        [[_bbox(box), text, float(conf), {source}] for (box, text, conf), source in zip(results, sources)],
+        key=lambda item: -_area(item[0])
+    )
+    merged = []
+    for rect, text, conf, item_sources in items:
+        absorbed = False
+        for other in merged:
+            o_rect, o_text = other[0], other[1]
+            if item_sources & other[3]:
+                continue
+            inter = _intersection(rect, o_rect)
+            if not inter:
+                continue
+            # Duplicato (o frammento) già contenuto in un box più grande
+            if inter >= 0.7 * _area(rect) and (text.lower() in o_text.lower() or o_text.lower() in text.lower()
+                                               or inter >= 0.9 * _area(rect)):
+                other[2] = max(other[2], conf)
+                other[3] |= item_sources
+                absorbed = True
+                break
+            # Stessa riga, box che si toccano sulla fascia tra due tasselli: unisci
+            v_overlap = min(rect[3], o_rect[3]) - max(rect[1], o_rect[1])
+            min_height = min(rect[3] - rect[1], o_rect[3] - o_rect[1])
+            if (min_height > 0 and v_overlap >= 0.6 * min_height
+                    and _seams_hit(rect, seams) & _seams_hit(o_rect, seams)):
+                if rect[0] < o_rect[0]:
+                    other[1] = _join_overlapping_text(text, o_text)
+                else:
+                    other[1] = _join_overlapping_text(o_text, text)
+                other[0] = (min(rect[0], o_rect[0]), min(rect[1], o_rect[1]),
+                            max(rect[2], o_rect[2]), max(rect[3], o_rect[3]))
+                other[2] = min(other[2], conf)
+                other[3] |= item_sources
+                absorbed = True
+                break
+        if not absorbed:
+            merged.append([rect, text, conf, item_sources])
+
+    return [
+        ([[r[0], r[1]], [r[2], r[1]], [r[2], r[3]], [r[0], r[3]]], text, conf)
+        for r, text, conf, _ in merged
+    ]
 
 
 class LocandineOCR:
-    def __init__(self):
-        """Inizializza il reader OCR per italiano"""
-        self.reader = easyocr.Reader(['it', 'en'], gpu=False)
+    def __init__(self, use_cache: bool = True, cache_dir: str = DEFAULT_CACHE_DIR, reader=None,
+                 preprocessor: Optional[ImagePreprocessor] = None, tiled: Optional[bool] = None,
+                 tile_size: int = DEFAULT_TILE_SIZE, tile_overlap: int = DEFAULT_TILE_OVERLAP,
+                 roi_first: bool = False, server_address: Optional[str] = DEFAULT_SERVER_ADDRESS,
+                 backend: Optional[str] = None):
+        """
+        Inizializza il motore OCR per italiano.
+        Se ``reader`` è None viene usato il reader condiviso del processo, caricato
+        solo al primo utilizzo effettivo. Se ``preprocessor`` è None si usa la
+        configurazione di default di ImagePreprocessor.
+        ``tiled``: True forza l'OCR a tasselli, False lo disattiva, None lo attiva
+        solo per immagini sorgente oltre DEFAULT_TILE_THRESHOLD_PX. A tasselli l'immagine
+        è ridotta a DEFAULT_TILE_THRESHOLD_PX pixel invece che al lato massimo del preprocessing.
+        ``roi_first``: legge prima le fasce di intestazione e si ferma se bastano.
+        ``server_address``: se indicato, l'inferenza è delegata al servizio OCR locale
+        (ocr_server.py) e questa istanza fa solo da client leggero.
+        ``backend``: 'stock' o 'float32' (default: variabile LOCANDINE_OCR_BACKEND).
+        """
+        if tile_overlap >= tile_size:
+            raise ValueError("tile_overlap deve essere minore di tile_size")
+        self.languages = OCR_LANGUAGES
+        self._reader = reader
+        self.backend = resolve_backend(backend)
+        self.preprocessor = preprocessor if preprocessor is not None else ImagePreprocessor()
+        self.tiled = tiled
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.roi_first = roi_first
+        self.client = None
+        if server_address and reader is None:
+            from ocr_server import OCRClient
+            self.client = OCRClient(server_address)
+        self.cache = OCRCache(cache_dir) if use_cache else None
+
+    @property
+    def engine_version(self) -> str:
+        """Versione di motore e pipeline (entra nella chiave della cache OCR)"""
+        return f"easyocr-{easyocr_version()}/p{OCR_PIPELINE_VERSION}/{self.backend}"
+
+    def extract_raw(self, image_path: str) -> List[tuple]:
+        """
+        Restituisce i risultati grezzi di readtext ``[(box, testo, confidenza), ...]``,
+        usando la cache su disco quando la stessa immagine è già stata analizzata
+        """
+        return self._extract(image_path, roi_first=self.roi_first)[0]
+
+    def _extract(self, image_path: str, roi_first: bool = False) -> Tuple[List[tuple], Dict]:
+        """Come extract_raw, ma restituisce anche il report del preprocessing"""
+        key = None
+        if self.cache is not None:
+            extra = self._config_key() + ("-roi" if roi_first else "")
+            key = OCRCache.make_key(file_sha256(image_path), self.languages, self.engine_version, extra=extra)
+            entry = self.cache.get_entry(key)
+            if entry is not None:
+                results, meta = entry
+                report = dict(meta.get('preprocess', {}), cached=True)
+                report['timings'] = {}  # Nessuna elaborazione: risultato dalla cache
+                return results, report
+
+        t0 = time.perf_counter()
+        use_tiles = self.tiled
+        if use_tiles is None:
+            # La soglia vale sulla sorgente: dopo la riduzione a max_side non sarebbe mai superata
+            use_tiles = ImagePreprocessor.source_pixels(image_path) > DEFAULT_TILE_THRESHOLD_PX
+        image, report = self.preprocessor.process(image_path, DEFAULT_TILE_THRESHOLD_PX if use_tiles else None)
+        report['timings'] = {'preprocess': time.perf_counter() - t0, 'detect': 0.0, 'recognize': 0.0}
+        report['tiled'] = use_tiles
+        report['tiles'] = 0
+        if roi_first:
+            raw, report['ocr_path'] = self._readtext_roi(image, report)
+        else:
+            raw = self._read_region(image, 0, image.shape[0], report)
+            report['ocr_path'] = 'full'
+        del image
+        result = rescale_boxes(raw, report['scale'])
+
+        if key is not None:
+            self.cache.put(key, result, meta={'source': os.path.basename(image_path), 'preprocess': report})
+        return result, dict(report, cached=False)
+
+    def _read_region(self, image: np.ndarray, y0: int, y1: int, report: Dict) -> List[tuple]:
+        """OCR della fascia orizzontale [y0, y1) con coordinate riportate all'immagine intera"""
+        region = image[y0:y1]
+        if report.get('tiled'):
+            raw, n_tiles = self._readtext_tiled(region, report.get('timings'))
+            report['tiles'] = report.get('tiles', 0) + n_tiles
+        else:
+            raw = self._readtext(region, report.get('timings'))
+        if not y0:
+            return raw
+        return [([[float(x), float(y) + y0] for x, y in box], text, conf) for box, text, conf in raw]
+
+    def _readtext_roi(self, image: np.ndarray, report: Dict) -> Tuple[List[tuple], str]:
+        """
+        OCR per regioni di interesse con uscita anticipata: data e orario stanno quasi
+        sempre nella fascia alta o nella striscia didascalia in basso. Si leggono prima
+        queste fasce e ci si ferma appena data e orario sono stati trovati; altrimenti si
+        completa con la parte centrale (senza rileggere le fasce già fatte).
+        Restituisce i risultati e il percorso seguito.
+        """
+        h, w = image.shape[:2]
+        margin = max(1, int(h * ROI_OVERLAP))
+        top_end = int(h * ROI_TOP_FRACTION)
+        bottom_start = int(h * (1 - ROI_BOTTOM_FRACTION))
+        # Fasce in cui le regioni si sovrappongono: solo qui si uniscono frammenti
+        seams = [(0, top_end - margin, w, top_end + margin), (0, bottom_start - margin, w, bottom_start + margin)]
+
+        results = self._read_region(image, 0, top_end + margin, report)
+        if self._has_header_fields(results):
+            return results, 'roi_top'
+        sources = [0] * len(results)
+
+        bottom = self._read_region(image, bottom_start - margin, h, report)
+        results += bottom
+        sources += [1] * len(bottom)
+        if self._has_header_fields(results):
+            return merge_tile_results(results, sources, seams), 'roi_top+bottom'
+
+        middle = self._read_region(image, top_end - margin, bottom_start + margin, report)
+        results += middle
+        sources += [2] * len(middle)
+        return merge_tile_results(results, sources, seams), 'roi_fallback_full'
+
+    def _has_header_fields(self, results: List[tuple]) -> bool:
+        """Vero se nel testo letto compaiono sia una data sia un orario"""
+        parsed = parse_event_text(self._join_lines(results))
+        return bool(parsed['date_iso']) and bool(parsed['time'])
+
+    def _config_key(self) -> str:
+        tiling = 'auto' if self.tiled is None else int(self.tiled)
+        return f"{self.preprocessor.config_key()}-t{tiling}-{self.tile_size}-{self.tile_overlap}"
+
+    def _readtext_tiled(self, image: np.ndarray, timings: Optional[Dict] = None) -> Tuple[List[tuple], int]:
+        """
+        OCR a tasselli sovrapposti: ogni tassello è una vista (non una copia) dell'array,
+        così la memoria dei modelli dipende da tile_size e non dalla dimensione della scansione
+        """
+        h, w = image.shape[:2]
+        step = self.tile_size - self.tile_overlap
+        ys = list(range(0, max(h - self.tile_overlap, 1), step))
+        xs = list(range(0, max(w - self.tile_overlap, 1), step))
+        # Fasce di sovrapposizione tra tasselli adiacenti
+        seams = ([(x0, 0, x0 + self.tile_overlap, h) for x0 in xs[1:]]
+                 + [(0, y0, w, y0 + self.tile_overlap) for y0 in ys[1:]])
+        results, sources = [], []
+        for tile_no, (y0, x0) in enumerate((y0, x0) for y0 in ys for x0 in xs):
+            tile = image[y0:y0 + self.tile_size, x0:x0 + self.tile_size]
+            for box, text, conf in self._readtext(tile, timings):
+                results.append(([[float(x) + x0, float(y) + y0] for x, y in box], text, conf))
+                sources.append(tile_no)
+        return merge_tile_results(results, sources, seams), len(ys) * len(xs)
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            return get_shared_reader(self.backend)
+        return self._reader
+
+    @property
+    def effective_backend(self) -> str:
+        """Backend realmente in uso ('server' se l'OCR è affidato al servizio condiviso)"""
+        if self.client is not None:
+            return 'server'
+        return getattr(self.reader, 'locandine_backend', 'stock')
+
+    def _readtext(self, image, timings: Optional[Dict] = None) -> List[tuple]:
+        """
+        Equivalente di readtext (detection + riconoscimento) serializzando l'accesso al
+        reader condiviso, o tramite il servizio OCR. Se ``timings`` è un dizionario vi
+        accumula i secondi spesi in 'detect' e 'recognize' (o 'remote' per il servizio).
+        """
+        if self.client is not None:
+            import numpy as np
+            t0 = time.perf_counter()
+            result = self.client.readtext(np.ascontiguousarray(image))
+            if timings is not None:
+                timings['remote'] = timings.get('remote', 0.0) + time.perf_counter() - t0
+            return result
+        from easyocr.utils import reformat_input
+        reader = self.reader
+        with _inference_lock:
+            t0 = time.perf_counter()
+            img, img_cv_grey = reformat_input(image)
+            horizontal_list, free_list = reader.detect(img)
+            t1 = time.perf_counter()
+            result = reader.recognize(img_cv_grey, horizontal_list[0], free_list[0])
+            t2 = time.perf_counter()
+        if timings is not None:
+            timings['detect'] = timings.get('detect', 0.0) + t1 - t0
+            timings['recognize'] = timings.get('recognize', 0.0) + t2 - t1
+        return result
     
     def extract_text(self, image_path: str) -> str:
         """Estrae tutto il testo dall'immagine"""
-        result = self.reader.readtext(image_path)
+        return self._join_lines(self.extract_raw(image_path))
+
+    @staticmethod
+    def _join_lines(result: List[tuple]) -> str:
         # Ordina per posizione verticale (y coordinate)
         result_sorted = sorted(result, key=lambda x: x[0][0][1])
         text_lines = [item[1] for item in result_sorted]
@@ -42,14 +554,10 @@ class LocandineOCR:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
                 date_str = match.group(0)
-                # Usa dateparser per parsing robusto
-                parsed_date = dateparser.parse(
-                    date_str, 
-                    languages=['it'],
-                    settings={'PREFER_DATES_FROM': 'future'}
-                )
+                # Normalizzazione veloce (fallback su dateparser solo se necessario)
+                parsed_date = parse_italian_date(date_str)
                 if parsed_date:
-                    return parsed_date
+                    return datetime(parsed_date.year, parsed_date.month, parsed_date.day)
         
         return None
     
@@ -114,78 +622,12 @@ class LocandineOCR:
         
     def parse_event_text(self, text: str) -> Dict:
         """
-        Parser intelligente per estrarre campi granulari e pulire la descrizione
+        Estrae i campi granulari dal testo usando il motore condiviso (event_parser).
+        ``date_text`` è mantenuto come alias di ``date`` per compatibilità.
         """
-        # 1. Estrai Data
-        dt = self.extract_date(text)
-        date_str = ""
-        if dt:
-            date_str = dt.strftime("%d/%m/2026")
-        else:
-            match = re.search(r'(\d{1,2}\s+(?:gennaio|febbraio|marzo|aprile|maggio|giugno|luglio|agosto|settembre|ottobre|novembre|dicembre))', text, re.I)
-            if match:
-                date_str = f"{match.group(1)} 2026"
-
-        # 2. Estrai Orario
-        time_str = self.extract_time(text) or ""
-
-        # 3. Inizializza campi
-        location = ""
-        venue = ""
-        address = ""
-        clean_lines = []
-        
-        lines = [l.strip() for l in text.split('\n') if l.strip()]
-        
-        for line in lines:
-            lower_line = line.lower()
-            
-            # Salta righe che contengono solo la data e la città (intestazione)
-            if any(m in lower_line for m in ['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno']):
-                # Se c'è un trattino, quello che segue è probabilmente la location
-                parts = re.split(r'[–\-\—]', line)
-                if len(parts) > 1:
-                    # Se la prima parte ha la data, la seconda è la location
-                    if any(m in parts[0].lower() for m in ['gennaio', 'febbraio', 'marzo']):
-                        location = parts[1].strip()
-                continue
-            
-            # Estrazione Presso (Venue)
-            if 'presso' in lower_line:
-                venue_match = re.search(r'presso\s+([^\–\-\|]+)', line, re.I)
-                if venue_match:
-                    venue = venue_match.group(1).strip()
-                    # Rimuovi la parte "presso..." dalla riga per pulire la descrizione
-                    line = line.replace(venue_match.group(0), "").strip()
-            
-            # Estrazione Indirizzo
-            if any(kw in lower_line for kw in ['via ', 'vico ', 'piazza ', 'corso ']):
-                addr_match = re.search(r'((?:via|vico|piazza|corso)\s+[^\–\-\|]+)', line, re.I)
-                if addr_match:
-                    address = addr_match.group(1).strip()
-                    # Rimuovi l'indirizzo dalla riga
-                    line = line.replace(addr_match.group(0), "").strip()
-
-            # Pulizia finale della riga da orari residui
-            line = re.sub(r'(?:ore|h)?\s*\d{1,2}[:\.]\d{2}', '', line, flags=re.I).strip()
-            line = re.sub(r'[–\-\—\|\/]$', '', line).strip() # Rimuove separatori a fine riga
-            
-            if len(line) > 3:
-                clean_lines.append(line)
-
-        # 4. Costruisci Descrizione e Titolo
-        description = " ".join(clean_lines) if clean_lines else "Incontro sulla riforma della Giustizia"
-        title = clean_lines[0] if clean_lines else "Nuovo Evento"
-        
-        return {
-            'title': title,
-            'date_text': date_str,
-            'time': time_str,
-            'location': location,
-            'venue': venue,
-            'address': address,
-            'description': description
-        }
+        parsed = parse_event_text(text)
+        parsed['date_text'] = parsed['date']
+        return parsed
 
     def analyze_from_text(self, text: str) -> Dict:
         """
@@ -196,14 +638,27 @@ class LocandineOCR:
         # ma preferiamo il nuovo formato granulare
         return parsed
 
-    def analyze_poster(self, image_path: str) -> Dict:
+    def analyze_poster(self, image_path: str, roi_first: Optional[bool] = None) -> Dict:
         """
-        Analizza completamente una locandina
+        Analizza completamente una locandina.
+        Con ``roi_first`` (default: impostazione del costruttore) legge prima solo le
+        fasce di intestazione/didascalia; il percorso seguito è in ``preprocess['ocr_path']``.
         """
-        full_text = self.extract_text(image_path)
+        if roi_first is None:
+            roi_first = self.roi_first
+        results, report = self._extract(image_path, roi_first=roi_first)
+        full_text = self._join_lines(results)
+        t0 = time.perf_counter()
         parsed = self.parse_event_text(full_text)
+        report.setdefault('timings', {})['parse'] = time.perf_counter() - t0
         parsed['full_text'] = full_text
+        parsed['boxes'] = [
+            {'box': [[float(x), float(y)] for x, y in box], 'text': text, 'confidence': round(float(conf), 4)}
+            for box, text, conf in results
+        ]
         parsed['image_path'] = image_path
+        parsed['preprocess'] = report
+        parsed['ocr_path'] = report.get('ocr_path', 'full')
         return parsed
 
 
@@ -0,0 +1,113 @@
+"""
+Coda di job OCR in background: l'analisi delle locandine non blocca l'interfaccia
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+STATUS_LABELS = {
+    PENDING: "⏳ In coda",
+    RUNNING: "⚙️ In elaborazione",
+    DONE: "✅ Completato",
+    FAILED: "❌ Errore",
+}
+
+
+class OCRJob:
+    """Stato di una singola analisi OCR"""
+
+    def __init__(self, image_path: str, owner: str, label: str, roi_first: bool = False):
+        self.id = uuid.uuid4().hex
+        self.image_path = image_path
+        self.owner = owner
+        self.label = label
+        self.roi_first = roi_first
+        self.status = PENDING
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def elapsed(self) -> float:
+        """Secondi trascorsi dall'invio (o durata totale se concluso)"""
+        end = self.finished_at or time.time()
+        return end - self.submitted_at
+
+    def as_row(self) -> Dict:
+        """Riga per la tabella dei job nell'interfaccia"""
+        return {
+            'File': self.label,
+            'Stato': STATUS_LABELS.get(self.status, self.status),
+            'Tempo (s)': round(self.elapsed(), 1),
+            'Dettagli': self.error or '',
+        }
+
+
+class OCRJobQueue:
+    """
+    Coda di job OCR condivisa dal processo. I job sopravvivono ai rerun di Streamlit
+    (la coda vive in ``st.cache_resource``) e sono filtrati per sessione tramite ``owner``.
+    """
+
+    def __init__(self, engine, max_workers: int = 1, max_age: float = 3600):
+        self.engine = engine
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-job")
+        self._jobs: Dict[str, OCRJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, image_path: str, owner: str, label: str, roi_first: bool = False) -> str:
+        """Accoda l'analisi di una locandina e restituisce l'id del job"""
+        job = OCRJob(image_path, owner, label, roi_first)
+        with self._lock:
+            self._purge_old()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def _run(self, job: OCRJob):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = self.engine.analyze_poster(job.image_path, roi_first=job.roi_first)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, owner: str) -> List[OCRJob]:
+        """Job di una sessione, in ordine di invio"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.submitted_at)
+
+    def discard(self, job_id: str):
+        """Rimuove un job concluso (es. dopo averne mostrato il risultato)"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _purge_old(self):
+        """Elimina i job conclusi e mai ritirati più vecchi di max_age"""
+        now = time.time()
+        for job_id in [jid for jid, job in self._jobs.items()
+                       if job.finished and now - job.finished_at > self.max_age]:
+            del self._jobs[job_id]
@@ -0,0 +1,336 @@
+"""
+Servizio OCR locale: un solo processo possiede i modelli EasyOCR e serve tutte le sessioni
+
+Avvio:
+    python ocr_server.py --address unix:/tmp/locandine-ocr.sock
+    python ocr_server.py --address 127.0.0.1:8765
+
+Client: impostare LOCANDINE_OCR_SERVER con lo stesso indirizzo prima di avviare
+l'app (oppure passare ``server_address`` a LocandineOCR).
+
+I messaggi viaggiano come pickle: chi si autentica può far eseguire codice al servizio.
+La chiave è LOCANDINE_OCR_AUTHKEY oppure, se non impostata, una chiave casuale che il
+servizio genera al primo avvio nel file AUTHKEY_FILE (permessi 0600, letto dai client
+dello stesso utente). Il servizio va esposto solo in locale.
+"""
+import argparse
+import bisect
+import ipaddress
+import os
+import queue
+import secrets
+import stat
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+import numpy as np
+
+
+AUTHKEY_ENV = "LOCANDINE_OCR_AUTHKEY"
+AUTHKEY_FILE = os.environ.get("LOCANDINE_OCR_AUTHKEY_FILE",
+                              os.path.join(os.path.expanduser("~"), ".locandine2word", "ocr_authkey"))
+DEFAULT_MAX_BATCH = 8
+DEFAULT_BATCH_WINDOW = 0.05  # secondi di attesa per raccogliere richieste da altre sessioni
+DEFAULT_RECOGNIZER_BATCH = 32
+STACK_PADDING = 32  # px bianchi tra le immagini impilate per il riconoscitore
+
+
+class AuthKeyError(RuntimeError):
+    """Chiave di autenticazione del servizio OCR assente o non sicura"""
+
+
+def load_authkey(create: bool = False, path: str = AUTHKEY_FILE) -> bytes:
+    """
+    Chiave condivisa tra servizio e client: LOCANDINE_OCR_AUTHKEY, altrimenti il file ``path``.
+    Con ``create`` (servizio) il file mancante viene generato con una chiave casuale.
+    """
+    key = os.environ.get(AUTHKEY_ENV, '')
+    if key:
+        return key.encode('utf-8')
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # Creato nel frattempo da un altro avvio
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(secrets.token_hex(32))
+    try:
+        if os.name == 'posix' and os.stat(path).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+            raise AuthKeyError(f"{path} è leggibile da altri utenti: impostare i permessi a 0600")
+        with open(path, 'r', encoding='utf-8') as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        raise AuthKeyError(f"Chiave del servizio OCR assente: impostare {AUTHKEY_ENV} "
+                           f"oppure avviare ocr_server.py, che crea {path}") from None
+    if not key:
+        raise AuthKeyError(f"{path} è vuoto")
+    return key.encode('utf-8')
+
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address: str):
+    """
+    Converte l'indirizzo testuale in quello di multiprocessing.connection:
+    ``unix:/percorso/socket`` oppure ``host:porta``
+    """
+    if address.startswith('unix:'):
+        return address[len('unix:'):], 'AF_UNIX'
+    host, _, port = address.rpartition(':')
+    return (host or '127.0.0.1', int(port)), 'AF_INET'
+
+
+class OCRClient:
+    """Client minimale: invia l'immagine già preprocessata e riceve i risultati readtext"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, timeout: float = 300):
+        self.address = address
+        self._address, self._family = parse_address(address)
+        self.authkey = authkey
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if self.authkey is None:
+                self.authkey = load_authkey()
+            self._conn = Client(self._address, family=self._family, authkey=self.authkey)
+        return self._conn
+
+    def readtext(self, image: np.ndarray) -> List[tuple]:
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    conn = self._connect()
+                    conn.send({'op': 'readtext', 'image': image})
+                    if not conn.poll(self.timeout):
+                        raise TimeoutError("Il servizio OCR non ha risposto in tempo")
+                    reply = conn.recv()
+                    break
+                except TimeoutError:
+                    # Nessun nuovo tentativo (raddoppierebbe l'attesa); la risposta in ritardo
+                    # non deve finire alla richiesta successiva: si chiude la connessione
+                    self.close()
+                    raise
+                except (EOFError, OSError):
+                    # Connessione caduta (es. server riavviato): un nuovo tentativo
+                    self.close()
+                    if attempt:
+                        raise
+        if reply.get('error'):
+            raise RuntimeError(f"Servizio OCR: {reply['error']}")
+        return [tuple(item) for item in reply['results']]
+
+    def ping(self) -> bool:
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.send({'op': 'ping'})
+                return conn.poll(5) and conn.recv().get('ok', False)
+        except (EOFError, OSError, AuthKeyError):
+            self.close()
+            return False
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+
+class _Request:
+    def __init__(self, image: np.ndarray):
+        self.image = image
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class OCRServer:
+    """
+    Accetta richieste da più client, le accoda e le elabora a lotti: la detection
+    resta per immagine, mentre i ritagli di testo orizzontali di tutte le richieste
+    del lotto passano insieme nel riconoscitore (una sola chiamata, batch pieni).
+    """
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, max_batch: int = DEFAULT_MAX_BATCH,
+                 batch_window: float = DEFAULT_BATCH_WINDOW, recognizer_batch: int = DEFAULT_RECOGNIZER_BATCH):
+        self.address = address
+        self.authkey = authkey if authkey is not None else load_authkey(create=True)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.recognizer_batch = recognizer_batch
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self.reader = None
+        self.stats = {'requests': 0, 'batches': 0}
+
+    def serve_forever(self):
+        from ocr_engine import get_shared_reader
+        self.reader = get_shared_reader()
+
+        address, family = parse_address(self.address)
+        if family == 'AF_INET' and not _is_loopback(address[0]):
+            print(f"ATTENZIONE: servizio OCR raggiungibile da altri host ({self.address}): "
+                  "chi conosce la chiave può eseguire codice su questa macchina")
+        if family == 'AF_UNIX' and os.path.exists(address):
+            os.remove(address)  # Socket rimasto da un avvio precedente
+        threading.Thread(target=self._batch_loop, name="ocr-batcher", daemon=True).start()
+        with Listener(address, family=family, authkey=self.authkey) as listener:
+            print(f"Servizio OCR in ascolto su {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError) as e:
+                    print(f"Connessione rifiutata: {e}")
+                    continue
+                threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+
+    def _handle_client(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                error = self._invalid_message(message)
+                if error:
+                    conn.send({'results': None, 'error': error})
+                    continue
+                if message['op'] == 'ping':
+                    conn.send({'ok': True, 'stats': dict(self.stats)})
+                    continue
+                request = _Request(message['image'])
+                self._queue.put(request)
+                request.done.wait()
+                conn.send({'results': request.results, 'error': request.error})
+
+    @staticmethod
+    def _invalid_message(message) -> Optional[str]:
+        """Motivo per cui il messaggio non è valido (None se valido)"""
+        if not isinstance(message, dict) or message.get('op') not in ('ping', 'readtext'):
+            return "Messaggio non valido: atteso {'op': 'ping'|'readtext', ...}"
+        if message['op'] == 'readtext':
+            image = message.get('image')
+            if not isinstance(image, np.ndarray) or image.dtype != np.uint8 or image.ndim not in (2, 3):
+                return "Messaggio non valido: 'image' deve essere un array uint8 a 2 o 3 dimensioni"
+            if image.ndim == 3 and image.shape[2] != 3:
+                return "Messaggio non valido: le immagini a colori devono avere 3 canali (BGR)"
+        return None
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                for request, results in zip(batch, self._readtext_batch([r.image for r in batch])):
+                    request.results = results
+            except Exception as e:
+                for request in batch:
+                    request.error = str(e)
+            finally:
+                self.stats['requests'] += len(batch)
+                self.stats['batches'] += 1
+                for request in batch:
+                    request.done.set()
+
+    def _readtext_batch(self, images: List[np.ndarray]) -> List[List[tuple]]:
+        """Equivalente di readtext su più immagini con riconoscimento dei ritagli in un unico passaggio"""
+        import cv2
+
+        greys, horizontals, frees = [], [], []
+        for image in images:
+            greys.append(image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+            horizontal_list, free_list = self.reader.detect(image)
+            horizontals.append(horizontal_list[0])
+            frees.append(free_list[0])
+
+        results: List[List[tuple]] = [[] for _ in images]
+
+        # Tutti i box orizzontali: le immagini in grigio vengono impilate in verticale (separate
+        # da STACK_PADDING) e i box traslati di conseguenza, così il riconoscitore li elabora
+        # insieme a batch pieni. I box sono limitati all'immagine da cui vengono (il margine
+        # della detection può sporgere): nessun ritaglio comprende testo di un'altra richiesta.
+        offsets, boxes, owners = [], [], {}
+        y = 0
+        for idx, (grey, horizontal_list) in enumerate(zip(greys, horizontals)):
+            offsets.append(y)
+            h, w = grey.shape[:2]
+            for x0, x1, y0, y1 in horizontal_list:
+                x0, x1 = max(0, int(x0)), min(w, int(x1))
+                y0, y1 = max(0, int(y0)) + y, min(h, int(y1)) + y
+                if x1 > x0 and y1 > y0:
+                    boxes.append([x0, x1, y0, y1])
+                    owners[(x0, y0, x1, y1)] = idx
+            y += h + STACK_PADDING
+        if boxes:
+            width = max(grey.shape[1] for grey in greys)
+            canvas = np.full((y, width), 255, dtype=np.uint8)
+            for offset, grey in zip(offsets, greys):
+                canvas[offset:offset + grey.shape[0], :grey.shape[1]] = grey
+            for box, text, conf in self.reader.recognize(canvas, horizontal_list=boxes, free_list=[],
+                                                        batch_size=self.recognizer_batch):
+                # Il box restituito è quello passato: si risale all'immagine dal box, non dalla y
+                xs, ys = [int(p[0]) for p in box], [int(p[1]) for p in box]
+                idx = owners.get((min(xs), min(ys), max(xs), max(ys)))
+                if idx is None:  # Per sicurezza: centro del box (dentro la sua immagine)
+                    idx = bisect.bisect_right(offsets, (min(ys) + max(ys)) / 2) - 1
+                results[idx].append(([[float(px), float(py) - offsets[idx]] for px, py in box], text, float(conf)))
+            del canvas
+
+        # Box ruotati (rari): per immagine
+        for idx, (grey, free_list) in enumerate(zip(greys, frees)):
+            if free_list:
+                for box, text, conf in self.reader.recognize(grey, horizontal_list=[], free_list=free_list,
+                                                            batch_size=self.recognizer_batch):
+                    results[idx].append(([[float(px), float(py)] for px, py in box], text, float(conf)))
+        return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Servizio OCR locale condiviso per Locandine2Word")
+    parser.add_argument('--address', default=os.environ.get("LOCANDINE_OCR_SERVER", "127.0.0.1:8765"),
+                        help="unix:/percorso/socket oppure host:porta (default: 127.0.0.1:8765)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Richieste massime per lotto")
+    parser.add_argument('--window', type=float, default=DEFAULT_BATCH_WINDOW,
+                        help="Attesa (s) per raccogliere richieste concorrenti")
+    parser.add_argument('--recognizer-batch', type=int, default=DEFAULT_RECOGNIZER_BATCH,
+                        help="Ritagli per batch del riconoscitore")
+    args = parser.parse_args(argv)
+
+    try:
+        server = OCRServer(args.address, max_batch=args.max_batch, batch_window=args.window,
+                           recognizer_batch=args.recognizer_batch)
+    except (AuthKeyError, OSError) as e:
+        print(f"Servizio OCR non avviato: {e}")
+        return 1
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServizio OCR arrestato.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
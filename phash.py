@@ -0,0 +1,160 @@
+"""
+Hash percettivo (dHash) delle locandine e indice per la ricerca dei quasi-duplicati
+
+Il dHash confronta la luminosità di pixel adiacenti in una miniatura 9x8 in scala di grigi:
+la stessa locandina ricompressa, ridimensionata o inoltrata come screenshot cambia pochi
+bit su 64, mentre locandine diverse ne cambiano circa la metà. La distanza tra due hash
+è la distanza di Hamming.
+"""
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+
+HASH_SIZE = 8                 # Hash di HASH_SIZE x HASH_SIZE bit
+NEAR_DUPLICATE_DISTANCE = 10  # Bit diversi (su 64) entro cui due locandine sono "la stessa"
+
+
+def _trim_border(img, tolerance: int = 16):
+    """
+    Toglie le bande uniformi ai bordi (barre di uno screenshot, cornici), che altrimenti
+    sposterebbero tutto il contenuto nella miniatura dell'hash
+    """
+    from PIL import Image, ImageChops
+
+    background = Image.new('L', img.size, img.getpixel((0, 0)))
+    mask = ImageChops.difference(img, background).point(lambda p: 255 if p > tolerance else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return img
+    width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    # Se resta troppo poco il "bordo" era parte della locandina
+    return img.crop(bbox) if width * height >= 0.4 * img.size[0] * img.size[1] else img
+
+
+def dhash(img, hash_size: int = HASH_SIZE) -> str:
+    """dHash di un'immagine PIL come stringa esadecimale (16 caratteri per 64 bit)"""
+    from PIL import Image, ImageOps
+
+    img = ImageOps.exif_transpose(img).convert('L')
+    img.thumbnail((256, 256))  # Il ritaglio dei bordi lavora su una copia piccola
+    img = _trim_border(img)
+    resample = getattr(Image, 'Resampling', Image).LANCZOS
+    pixels = list(img.resize((hash_size + 1, hash_size), resample).getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def image_dhash(image_path: str) -> str:
+    """dHash del file immagine ('' se il file non esiste o non è un'immagine leggibile)"""
+    try:
+        from PIL import Image
+    except ImportError:  # Senza Pillow l'hash non si calcola: nessun quasi-duplicato segnalato
+        return ''
+    try:
+        with Image.open(image_path) as img:
+            img.draft('L', (64, 64))  # JPEG: decodifica direttamente a bassa risoluzione
+            return dhash(img)
+    except (OSError, ValueError):
+        return ''
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(bits: int, radius: int) -> Tuple[int, ...]:
+    """Tutte le maschere di ``bits`` bit con al più ``radius`` bit a 1"""
+    return tuple(sum(1 << b for b in combo)
+                 for r in range(radius + 1) for combo in combinations(range(bits), r))
+
+
+class HammingIndex:
+    """
+    Indice per la ricerca degli hash entro una distanza di Hamming (multi-index hashing).
+
+    L'hash a 64 bit è diviso in ``chunks`` blocchi da 16 bit, ognuno con la sua tabella
+    blocco -> elementi. Se due hash distano al più r, per il principio dei cassetti almeno
+    un blocco dista al più r // chunks: basta quindi cercare in ogni tabella i blocchi
+    vicini (poche centinaia di chiavi) e verificare solo i candidati trovati, invece di
+    confrontare tutti gli hash. (Un BK-tree, a distanza 10 su 64 bit, visita gran parte
+    dell'albero e non è più veloce della scansione completa.)
+    Gli insiemi nelle tabelle sono frozenset sostituiti a ogni modifica: ``copy()`` copia
+    solo le tabelle, non gli insiemi (istantanee copy-on-write di EventIndex).
+    """
+
+    def __init__(self, bits: int = HASH_SIZE * HASH_SIZE, chunks: int = 4):
+        self.bits = bits
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self._tables: List[Dict[int, FrozenSet]] = [{} for _ in range(chunks)]
+        self._values: Dict[object, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, item) -> bool:
+        return item in self._values
+
+    def copy(self) -> 'HammingIndex':
+        other = HammingIndex.__new__(HammingIndex)
+        other.bits, other.chunks, other.chunk_bits = self.bits, self.chunks, self.chunk_bits
+        other._chunk_mask = self._chunk_mask
+        other._tables = [dict(table) for table in self._tables]
+        other._values = dict(self._values)
+        return other
+
+    def _split(self, value: int):
+        for i in range(self.chunks):
+            yield i, (value >> (i * self.chunk_bits)) & self._chunk_mask
+
+    def add(self, item, value: int):
+        self.discard(item)
+        self._values[item] = value
+        for i, chunk in self._split(value):
+            table = self._tables[i]
+            table[chunk] = table.get(chunk, frozenset()) | {item}
+
+    def discard(self, item):
+        value = self._values.pop(item, None)
+        if value is None:
+            return
+        for i, chunk in self._split(value):
+            table = self._tables[i]
+            items = table.get(chunk, frozenset()) - {item}
+            if items:
+                table[chunk] = items
+            else:
+                table.pop(chunk, None)
+
+    def search(self, value: int, max_distance: int = NEAR_DUPLICATE_DISTANCE) -> List[Tuple[int, object]]:
+        """Elementi entro ``max_distance`` come (distanza, elemento), dal più vicino"""
+        masks = _flip_masks(self.chunk_bits, max_distance // self.chunks)
+        candidates = set()
+        for i, chunk in self._split(value):
+            table = self._tables[i]
+            for mask in masks:
+                items = table.get(chunk ^ mask)
+                if items:
+                    candidates.update(items)
+        results = []
+        for item in candidates:
+            distance = hamming(value, self._values[item])
+            if distance <= max_distance:
+                results.append((distance, item))
+        results.sort(key=lambda r: r[0])
+        return results
+
+
+def parse_hash(value: Optional[str]) -> Optional[int]:
+    """Hash esadecimale -> intero (None se assente o non valido)"""
+    try:
+        return int(value, 16) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,158 @@
+"""
+Generatore di locandine sintetiche (PIL) con campi noti, per misurare velocità e accuratezza dell'OCR
+"""
+import glob
+import io
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+
+CITIES = ['GENOVA', 'LA SPEZIA', 'SAVONA', 'IMPERIA', 'SARZANA', 'CHIAVARI', 'RAPALLO', 'MASSA', 'CARRARA', 'AULLA']
+VENUES = ['Circolo Zenzero', 'Sala Consiliare', 'Biblioteca Civica', 'Teatro Comunale', 'Sala della Pace',
+          'Centro Sociale Primo Maggio', 'Auditorium San Francesco', 'Società Operaia di Mutuo Soccorso']
+STREETS = ['Via Torti', 'Via Roma', 'Piazza Matteotti', 'Corso Italia', 'Via Garibaldi', 'Piazza Verdi',
+           'Via XX Settembre', 'Corso Cavour']
+DESCRIPTIONS = ['Incontro pubblico sul REFERENDUM GIUSTIZIA', 'Referendum: perché votare NO',
+                'Incontro sulla riforma della Giustizia', 'Dibattito pubblico sulla separazione delle carriere',
+                'Assemblea cittadina aperta a tutti']
+WEEKDAYS = ['LUNEDÌ', 'MARTEDÌ', 'MERCOLEDÌ', 'GIOVEDÌ', 'VENERDÌ', 'SABATO', 'DOMENICA']
+MONTHS = ['GENNAIO', 'FEBBRAIO', 'MARZO', 'APRILE', 'MAGGIO', 'GIUGNO', 'LUGLIO', 'AGOSTO',
+          'SETTEMBRE', 'OTTOBRE', 'NOVEMBRE', 'DICEMBRE']
+BACKGROUNDS = [(255, 255, 255), (250, 244, 225), (225, 238, 250), (255, 230, 230), (236, 250, 236)]
+
+FONT_DIRS = ['/usr/share/fonts', '/usr/local/share/fonts', '/Library/Fonts', 'C:/Windows/Fonts',
+             os.path.expanduser('~/.fonts')]
+
+# Livelli di disturbo: (rumore gaussiano, rotazione max in gradi, sfocatura, qualità JPEG)
+NOISE_LEVELS = {
+    0: (0, 0.0, 0.0, 95),
+    1: (12, 1.0, 0.0, 85),
+    2: (25, 2.5, 0.8, 70),
+    3: (40, 4.0, 1.2, 50),
+}
+
+# Formato A4 a 150 dpi
+POSTER_SIZE = (1240, 1754)
+
+
+def find_fonts(limit: int = 6) -> List[str]:
+    """Font TrueType disponibili nel sistema (lista vuota se nessuno: si usa il font di PIL)"""
+    fonts = []
+    for folder in FONT_DIRS:
+        fonts += glob.glob(os.path.join(folder, '**', '*.ttf'), recursive=True)
+    preferred = [f for f in fonts if any(k in os.path.basename(f) for k in ('DejaVu', 'Liberation', 'Arial', 'Verdana'))]
+    return sorted(set(preferred or fonts))[:limit]
+
+
+def _load_font(path: Optional[str], size: int):
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(size=size)  # Pillow >= 10.1
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def random_event(rng: random.Random, year: int = 2026) -> Dict:
+    """Campi di un evento casuale (la verità di riferimento della locandina)"""
+    d = date(year, 1, 1) + timedelta(days=rng.randrange(365))
+    city = rng.choice(CITIES)
+    number = rng.randint(1, 120)
+    return {
+        'date_iso': d.isoformat(),
+        'date': f"{d.day:02d} {MONTHS[d.month - 1]} {d.year}",
+        'weekday': WEEKDAYS[d.weekday()],
+        'time': f"{rng.choice([9, 10, 11, 15, 16, 17, 18, 20, 21])}:{rng.choice(['00', '15', '30', '45'])}",
+        'location': city,
+        'venue': rng.choice(VENUES),
+        'address': f"{rng.choice(STREETS)} {number} - {city.title()}",
+        'description': rng.choice(DESCRIPTIONS),
+    }
+
+
+def poster_lines(event: Dict) -> List[tuple]:
+    """Righe della locandina come (testo, scala del font), nel formato dei documenti del comitato"""
+    return [
+        (f"{event['weekday']} {event['date']} – {event['location']}", 1.0),
+        (event['description'], 0.8),
+        (f"Ore {event['time']} – {event['venue']}", 0.8),
+        (event['address'], 0.7),
+    ]
+
+
+def render_poster(event: Dict, rng: random.Random, font_path: Optional[str] = None,
+                  base_size: int = 56, noise: int = 0) -> Image.Image:
+    """Disegna la locandina: testo centrato su sfondo colorato con un po' di grafica di disturbo"""
+    img = Image.new('RGB', POSTER_SIZE, rng.choice(BACKGROUNDS))
+    draw = ImageDraw.Draw(img)
+    w, h = img.size
+
+    # Fasce e riquadri decorativi
+    accent = tuple(rng.randint(40, 200) for _ in range(3))
+    draw.rectangle([0, 0, w, int(h * 0.04)], fill=accent)
+    draw.rectangle([0, int(h * 0.96), w, h], fill=accent)
+    draw.rectangle([int(w * 0.1), int(h * 0.38), int(w * 0.9), int(h * 0.62)],
+                   outline=accent, width=6)
+
+    y = int(h * 0.08)
+    for text, scale in poster_lines(event):
+        font = _load_font(font_path, int(base_size * scale))
+        # Riduce il font finché la riga non sta nella larghezza utile
+        size = int(base_size * scale)
+        while draw.textlength(text, font=font) > w * 0.9 and size > 12:
+            size -= 2
+            font = _load_font(font_path, size)
+        x = (w - draw.textlength(text, font=font)) / 2
+        draw.text((x, y), text, fill=(20, 20, 20), font=font)
+        y += int(size * 1.8)
+        if y > h * 0.35 and scale < 1.0:
+            y = max(y, int(h * 0.66))  # Le righe successive vanno nella parte bassa
+
+    sigma, max_rotation, blur, quality = NOISE_LEVELS.get(noise, NOISE_LEVELS[0])
+    if sigma:
+        noise_layer = Image.effect_noise(img.size, sigma).convert('RGB')
+        img = Image.blend(img, noise_layer, 0.15)
+    if max_rotation:
+        img = img.rotate(rng.uniform(-max_rotation, max_rotation), expand=False, fillcolor=(255, 255, 255))
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+    # Ricompressione JPEG (come le immagini condivise via chat)
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    buffer.seek(0)
+    return Image.open(buffer).convert('RGB')
+
+
+def generate_posters(out_dir: str, count: int, seed: int = 42, noise_levels=(0, 1, 2),
+                     font_sizes=(44, 56, 72)) -> List[Dict]:
+    """
+    Genera ``count`` locandine in ``out_dir`` variando font, dimensioni e disturbo.
+    Restituisce per ognuna il percorso, i parametri di resa e i campi attesi.
+    """
+    rng = random.Random(seed)
+    fonts = find_fonts() or [None]
+    os.makedirs(out_dir, exist_ok=True)
+    posters = []
+    for i in range(count):
+        event = random_event(rng)
+        font_path = fonts[i % len(fonts)]
+        size = font_sizes[i % len(font_sizes)]
+        noise = noise_levels[i % len(noise_levels)]
+        img = render_poster(event, rng, font_path, size, noise)
+        path = os.path.join(out_dir, f"synthetic_{i:03d}.jpg")
+        img.save(path, quality=95)
+        posters.append({
+            'image_path': path,
+            'font': os.path.basename(font_path) if font_path else 'default',
+            'font_size': size,
+            'noise': noise,
+            'truth': event,
+        })
+    return posters
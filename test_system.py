@@ -87,6 +87,215 @@ def test_json_database():
     
     return True
 
+def test_date_normalizer():
+    """Test normalizzazione date italiane"""
+    print("\n[TEST 6] Normalizzazione date...")
+    
+    try:
+        from date_utils import to_iso
+        cases = {
+            "07 FEBBRAIO 2026": "2026-02-07",
+            "15/02/2026": "2026-02-15",
+            "SABATO' 15 Feb 2026": "2026-02-15",
+        }
+        for text, expected in cases.items():
+            result = to_iso(text)
+            if result != expected:
+                print(f"   [FAIL] '{text}' -> '{result}' (atteso '{expected}')")
+                return False
+        print("   [OK] Date normalizzate correttamente")
+        return True
+    except Exception as e:
+        print(f"   [FAIL] Errore normalizzazione date: {e}")
+        return False
+
+def test_event_parser():
+    """Test estrazione dei campi evento dal testo delle locandine"""
+    print("\n[TEST 7] Estrazione campi evento...")
+
+    try:
+        from event_parser import parse_event_text, DEFAULT_TITLE
+        cases = [
+            ("07 FEBBRAIO – GENOVA\nConferenza – Ore 16.30 – Biblioteca Berio\nVia del Seminario 16",
+             {'date_iso': '2026-02-07', 'location': 'GENOVA', 'description': 'Conferenza', 'time': '16:30',
+              'address': 'Via del Seminario 16'}),
+            ("\n\n", {'title': DEFAULT_TITLE}),
+            # Data trovata nel corpo: non resta in titolo e descrizione
+            ("MOSTRA FOTOGRAFICA\nInaugurazione 12/03/2026 – Ore 17:00 – Sala Rossa",
+             {'date_iso': '2026-03-12', 'title': 'Inaugurazione...', 'description': 'Inaugurazione',
+              'venue': 'Sala Rossa'}),
+            # Orario con 'h' seguito da virgola
+            ("SABATO 7 MARZO – GENOVA\nConcerto h 21.00, Teatro Carlo Felice",
+             {'time': '21:00', 'description': 'Concerto', 'venue': 'Teatro Carlo Felice'}),
+        ]
+        for text, expected in cases:
+            result = parse_event_text(text)
+            wrong = {field: result[field] for field, value in expected.items() if result[field] != value}
+            if wrong:
+                print(f"   [FAIL] {text!r} -> {wrong} (atteso {expected})")
+                return False
+        print("   [OK] Campi evento estratti correttamente")
+        return True
+    except Exception as e:
+        print(f"   [FAIL] Errore estrazione campi: {e}")
+        return False
+
+def test_event_store():
+    """Test archivio SQLite: import/export di data.json, salvataggio per evento e conflitti di versione"""
+    print("\n[TEST 8] Archivio eventi SQLite...")
+    
+    try:
+        import json
+        import tempfile
+        from event_store import EventStore, EventCache, ConflictError, editable_copy, edited_fields
+        from event_model import Event
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'data.json')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump([{'title': 'A', 'date': '07 FEBBRAIO 2026', 'location': 'GENOVA'},
+                           {'title': 'B', 'date': '15/02/2026', 'location': 'SAVONA'}], f)
+            store = EventStore(os.path.join(tmp, 'events.db'), json_path=json_path)
+            store.ensure_imported()
+            events = store.all()
+            revision = store.revision()
+            stale_copy = dict(events[0])
+            events[0]['title'] = 'A2'
+            store.upsert(events[0])
+            try:
+                store.upsert(dict(stale_copy, title='A3'))  # Letto prima della modifica: conflitto
+                print("   [FAIL] Sovrascrittura di una versione superata non rilevata")
+                return False
+            except ConflictError:
+                pass
+            # Editor aperto alla versione corrente; un'altra sessione salva prima di "Aggiorna"
+            loaded_version = store.version(events[0]['id'])
+            loaded = {'title': 'A2'}
+            form = {'title': 'A4'}  # Modifica non salvata
+            store.upsert(dict(events[0], title='A5'))
+            fresh = store.get(events[0]['id'])
+            try:
+                store.upsert(dict(editable_copy(fresh, loaded_version), **form))
+                print("   [FAIL] Editor con versione superata ha sovrascritto l'altra sessione")
+                return False
+            except ConflictError:
+                pass
+            if edited_fields(loaded, form) != ['title'] or store.get(events[0]['id'])['title'] != 'A5':
+                print("   [FAIL] Conflitto dell'editor non gestito")
+                return False
+            # Salvataggio dalla stessa sessione: l'editor riparte dalla versione salvata
+            saved = dict(editable_copy(store.get(events[0]['id']), store.version(events[0]['id'])), title='A6')
+            store.upsert(saved)
+            loaded_version, loaded = saved['version'], {'title': saved['title']}
+            if edited_fields(loaded, {'title': 'A6'}) or loaded_version != store.version(events[0]['id']):
+                print("   [FAIL] Salvataggio della sessione scambiato per un conflitto")
+                return False
+            store.upsert(dict(editable_copy(store.get(events[0]['id']), loaded_version), title='A5'))
+            if store.changes_since(revision)[1] != {events[0]['id']}:
+                print("   [FAIL] Log delle modifiche inatteso")
+                return False
+            store.delete(events[1]['id'])
+            cache = EventCache(store)
+            before = cache.snapshot()
+            store.upsert({'title': 'C', 'date': '1 marzo 2026'})
+            after = cache.snapshot()
+            if len(before) != 1 or [ev['title'] for ev in after.events()] != ['A5', 'C']:
+                print("   [FAIL] Istantanea condivisa non aggiornata")
+                return False
+            store.export_json()
+            with open(json_path, 'r', encoding='utf-8') as f:
+                exported = json.load(f)
+            store.close()
+        if [ev['title'] for ev in exported] != ['A5', 'C'] or exported[0]['date_iso'] != '2026-02-07':
+            print(f"   [FAIL] Contenuto inatteso: {exported}")
+            return False
+        record = Event.from_dict(exported[0])
+        if record.to_dict() != exported[0] or record.province != 'GENOVA' or after.get(record.id).day != record.day:
+            print(f"   [FAIL] Conversione Event non fedele: {record.to_dict()}")
+            return False
+        print("   [OK] Archivio eventi funzionante")
+        return True
+    except Exception as e:
+        print(f"   [FAIL] Errore archivio eventi: {e}")
+        return False
+
+def test_near_duplicates():
+    """Test ricerca dei quasi-duplicati: indice di Hamming e locandine simili nell'elenco eventi"""
+    print("\n[TEST 9] Quasi-duplicati (hash percettivo)...")
+
+    try:
+        from phash import HammingIndex
+        from event_store import EventIndex
+        index = HammingIndex()
+        index.add('a', 0x0F0F0F0F0F0F0F0F)
+        index.add('b', 0x0F0F0F0F0F0F0F0F ^ 0b111)  # 3 bit diversi
+        index.add('c', 0xF0F0F0F0F0F0F0F0)
+        if index.search(0x0F0F0F0F0F0F0F0F, 4) != [(0, 'a'), (3, 'b')]:
+            print(f"   [FAIL] Ricerca nell'indice di Hamming inattesa: {index.search(0x0F0F0F0F0F0F0F0F, 4)}")
+            return False
+        index.discard('a')
+        if [item for _, item in index.search(0x0F0F0F0F0F0F0F0F, 4)] != ['b'] or 'a' in index:
+            print("   [FAIL] Rimozione dall'indice di Hamming non riuscita")
+            return False
+        events = EventIndex([
+            {'id': 'orig', 'title': 'A', 'phash': '0f0f0f0f0f0f0f0f'},
+            {'id': 'copia', 'title': 'A ricompressa', 'phash': '0f0f0f0f0f0f0f08'},  # 3 bit diversi
+            {'id': 'altra', 'title': 'B', 'phash': 'f0f0f0f0f0f0f0f0'},
+            {'id': 'senza', 'title': 'C'},
+        ])
+        found = [(distance, ev.id) for distance, ev in events.near_duplicates('0f0f0f0f0f0f0f0f', exclude=['orig'])]
+        if found != [(3, 'copia')]:
+            print(f"   [FAIL] Quasi-duplicati inattesi: {found}")
+            return False
+        events.remove('copia')
+        if events.near_duplicates('0f0f0f0f0f0f0f0f', exclude=['orig']) or events.near_duplicates('non-esadecimale'):
+            print("   [FAIL] Quasi-duplicati dopo la rimozione o con hash non valido")
+            return False
+        print("   [OK] Quasi-duplicati individuati")
+        return True
+    except Exception as e:
+        print(f"   [FAIL] Errore quasi-duplicati: {e}")
+        return False
+
+def test_upload_store():
+    """Test archivio delle locandine per contenuto: nomi ricaricati, omonimi e indice su disco"""
+    print("\n[TEST 10] Archivio locandine caricate...")
+
+    try:
+        import tempfile
+        from upload_store import UploadStore
+        from locandine_cli import ingest
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, 'uploads')
+            uploads = UploadStore(root)
+            first = uploads.put('locandina.jpg', b'contenuto uno')
+            again = uploads.put('copia.jpg', b'contenuto uno')  # Stessi byte, altro nome
+            if not first['stored'] or again['stored'] or again['path'] != first['path'] or again['aliases'] != ['locandina.jpg']:
+                print(f"   [FAIL] Stesso contenuto con altro nome non riconosciuto: {again}")
+                return False
+            other = uploads.put('locandina.jpg', b'contenuto due')  # Stesso nome, file diverso
+            if not other['stored'] or other['path'] == first['path'] or not os.path.exists(first['path']):
+                print(f"   [FAIL] File omonimo ha sovrascritto il precedente: {other}")
+                return False
+            reloaded = UploadStore(root)
+            if (reloaded.hash_of('locandina.jpg') != other['hash'] or reloaded.names_for(first['hash']) != ['copia.jpg']
+                    or reloaded.path_of(first['hash']) != first['path']):
+                print("   [FAIL] Indice delle locandine non ricaricato")
+                return False
+            folder = os.path.join(tmp, 'cartella')
+            os.makedirs(folder)
+            for name, data in [('a.jpg', b'contenuto uno'), ('b.png', b'contenuto tre'), ('c.jpg', b'contenuto tre')]:
+                with open(os.path.join(folder, name), 'wb') as f:
+                    f.write(data)
+            summary = ingest(folder, root)  # La CLI passa dallo stesso archivio
+            if len(summary['copied']) != 1 or len(summary['skipped']) != 2 or len(os.listdir(root)) != 4:
+                print(f"   [FAIL] Acquisizione da cartella inattesa: {summary}")
+                return False
+        print("   [OK] Archivio locandine funzionante")
+        return True
+    except Exception as e:
+        print(f"   [FAIL] Errore archivio locandine: {e}")
+        return False
+
 def run_all_tests():
     """Esegue tutti i test"""
     print("=" * 50)
@@ -98,7 +307,12 @@ def run_all_tests():
         test_ocr_initialization,
         test_word_generator,
         test_directories,
-        test_json_database
+        test_json_database,
+        test_date_normalizer,
+        test_event_parser,
+        test_event_store,
+        test_near_duplicates,
+        test_upload_store
     ]
     
     results = []
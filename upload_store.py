@@ -0,0 +1,99 @@
+"""
+Archivio delle locandine caricate, indicizzato per contenuto
+
+Ogni immagine viene salvata una sola volta in uploads/ con un nome derivato dall'hash
+SHA-256 del contenuto; un indice JSON tiene le corrispondenze nome caricato -> hash e
+hash -> file. Ricaricare la stessa locandina, anche con un altro nome, non scrive nulla
+e viene riconosciuto subito; due file diversi con lo stesso nome non si sovrascrivono.
+Al primo salvataggio si calcola anche l'hash percettivo (phash.py), per i quasi-duplicati.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from phash import image_dhash
+
+
+UPLOADS_DIR = "uploads"
+INDEX_FILE = ".upload_index.json"
+HASH_PREFIX_LEN = 16  # Caratteri dell'hash usati nel nome del file
+
+
+def _atomic_write(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class UploadStore:
+    """
+    Locandine caricate salvate per contenuto. ``put`` restituisce un dizionario con
+    nome, hash, hash percettivo (``phash``), percorso (con /, come ``image_path`` negli
+    eventi), ``stored`` (False se il contenuto era già presente) e ``aliases`` (altri nomi
+    con cui è stato caricato).
+    Un'istanza per processo, condivisa dalle sessioni.
+    """
+
+    def __init__(self, root: str = UPLOADS_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        self._names: Dict[str, str] = index.get('names', {})  # nome caricato -> hash
+        self._files: Dict[str, str] = index.get('files', {})  # hash -> file in root
+        self._phashes: Dict[str, str] = index.get('phashes', {})  # hash -> hash percettivo
+
+    def _save_index(self):
+        data = json.dumps({'names': self._names, 'files': self._files, 'phashes': self._phashes},
+                          ensure_ascii=False, indent=2)
+        _atomic_write(self.index_path, data.encode('utf-8'))
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.root, file_name).replace('\\', '/')
+
+    def put(self, name: str, data) -> Dict:
+        """Salva il contenuto (solo se nuovo) e registra il nome con cui è stato caricato"""
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            stored = False
+            file_name = self._files.get(content_hash)
+            if not file_name or not os.path.exists(os.path.join(self.root, file_name)):
+                ext = os.path.splitext(name)[1].lower() or '.jpg'
+                file_name = f"{content_hash[:HASH_PREFIX_LEN]}{ext}"
+                path = os.path.join(self.root, file_name)
+                if not os.path.exists(path):
+                    _atomic_write(path, data)
+                    stored = True
+            perceptual = self._phashes.get(content_hash)
+            if perceptual is None:
+                perceptual = image_dhash(os.path.join(self.root, file_name))
+            if (self._files.get(content_hash) != file_name or self._names.get(name) != content_hash
+                    or self._phashes.get(content_hash) != perceptual):
+                self._files[content_hash] = file_name
+                self._names[name] = content_hash
+                self._phashes[content_hash] = perceptual
+                self._save_index()
+            aliases = [other for other, h in self._names.items() if h == content_hash and other != name]
+        return {'name': name, 'hash': content_hash, 'phash': perceptual, 'path': self._path(file_name),
+                'stored': stored, 'aliases': aliases}
+
+    def hash_of(self, name: str) -> Optional[str]:
+        """Hash dell'ultimo contenuto caricato con questo nome"""
+        return self._names.get(name)
+
+    def path_of(self, content_hash: str) -> Optional[str]:
+        file_name = self._files.get(content_hash)
+        return self._path(file_name) if file_name else None
+
+    def names_for(self, content_hash: str) -> List[str]:
+        """Nomi con cui è stato caricato questo contenuto"""
+        with self._lock:
+            return [name for name, h in self._names.items() if h == content_hash]
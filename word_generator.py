@@ -3,13 +3,13 @@ Generatore di documenti Word con locandine ordinate cronologicamente
 """
 import json
 import os
-import dateparser
-import re
 from typing import List, Dict
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import Inches, Pt, RGBColor
-from docx import Document
 from datetime import datetime
+from date_utils import event_date
+from event_model import Event
+
+# python-docx viene importato alla prima generazione: caricare i dati o ordinare
+# gli eventi non deve pagarne il costo di import
 
 
 class WordGenerator:
@@ -18,6 +18,7 @@ class WordGenerator:
         Inizializza il generatore
         Se template_path è None, crea un documento nuovo
         """
+        from docx import Document
         if template_path and os.path.exists(template_path):
             self.doc = Document(template_path)
         else:
@@ -26,6 +27,7 @@ class WordGenerator:
     
     def _setup_default_styles(self):
         """Configura gli stili di default del documento"""
+        from docx.shared import Inches
         # Imposta margini
         sections = self.doc.sections
         for section in sections:
@@ -39,6 +41,7 @@ class WordGenerator:
         Aggiunge una singola entry evento al documento
         Formato: Tabella 1x2 (immagine a sinistra, testo o immagine a destra)
         """
+        from docx.shared import Inches
         # Crea tabella 1 riga x 2 colonne
         table = self.doc.add_table(rows=1, cols=2)
         
@@ -68,8 +71,12 @@ class WordGenerator:
         # Aggiungi spazio dopo la tabella
         self.doc.add_paragraph()
 
-    def _insert_image(self, cell, image_path, width=Inches(2.5)):
-        """Helper per inserire un'immagine in una cella"""
+    def _insert_image(self, cell, image_path, width=None):
+        """Helper per inserire un'immagine in una cella (larghezza di default 2.5 pollici)"""
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches
+        if width is None:
+            width = Inches(2.5)
         if os.path.exists(image_path):
             paragraph = cell.paragraphs[0]
             run = paragraph.add_run()
@@ -79,7 +86,8 @@ class WordGenerator:
 
     def _insert_text_details(self, cell, event_data):
         """Inserisce i dettagli testuali senza emoji (formato professionale)"""
-        
+        from docx.shared import Pt, RGBColor
+
         p = cell.paragraphs[0]
 
         # Titolo
@@ -101,11 +109,8 @@ class WordGenerator:
         # Data formattata
         if event_data.get('date'):
             date_str = event_data['date']
-            try:
-                dt = dateparser.parse(date_str, languages=['it'])
-                date_formatted = dt.strftime('%d %B %Y') if dt else date_str
-            except:
-                date_formatted = date_str
+            dt = event_date(event_data)
+            date_formatted = dt.strftime('%d %B %Y') if dt else date_str
             add_field("DATA", date_formatted)
 
         add_field("ORARIO", event_data.get('time'))
@@ -120,17 +125,13 @@ class WordGenerator:
     @staticmethod
     def get_sort_date(event: Dict) -> datetime:
         """Helper statico per ottenere la data datetime da un evento"""
-        d_str = event.get('date', '')
-        if not d_str:
+        if not event.get('date') and not event.get('date_iso'):
             return datetime.max # Metti in fondo se non ha data
         
-        # Usa dateparser per capire la data
-        try:
-            dt = dateparser.parse(d_str, languages=['it'])
-            if dt:
-                return dt
-        except:
-            pass
+        # Usa la data ISO precalcolata (o la normalizzazione memoizzata)
+        d = event_date(event)
+        if d:
+            return datetime(d.year, d.month, d.day)
         return datetime.max # Fallback in fondo
 
     def generate_from_data(self, events: List[Dict], output_path: str, mode: str = "standard", show_borders: bool = False):
@@ -140,12 +141,15 @@ class WordGenerator:
         2. Eventi (Standard o Minimal)
         3. Firma (se esiste)
         """
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches, Pt
         # Creiamo un nuovo documento pulito
         self.doc = Document()
         self._setup_default_styles()
 
-        # Aggiungi ogni evento
-        sorted_events = sorted(events, key=self.get_sort_date)
+        # Aggiungi ogni evento (data, luogo e provincia precalcolati negli Event)
+        sorted_events = sorted((Event.from_dict(ev) for ev in events), key=lambda ev: ev.sort_day)
 
         # 1. TITOLO E STATISTICHE (Sempre "Eventi e Locandine")
         title_text = "Eventi e Locandine"
@@ -170,21 +174,7 @@ class WordGenerator:
         self.doc.add_paragraph(f"Totale Locandine caricate: {total_ev}", style='List Bullet')
         
         # --- STATISTICHE GEOGRAFICHE ---
-        # Mappatura Province/Regioni
-        PROV_TO_REG = {
-            'GENOVA': 'LIGURIA', 'GE': 'LIGURIA',
-            'LA SPEZIA': 'LIGURIA', 'SP': 'LIGURIA',
-            'SAVONA': 'LIGURIA', 'SV': 'LIGURIA',
-            'IMPERIA': 'LIGURIA', 'IM': 'LIGURIA',
-            'MASSA': 'TOSCANA', 'MS': 'TOSCANA', 'MASSA CARRARA': 'TOSCANA', 'CARRARA': 'TOSCANA'
-        }
-        
-        # Mappatura nomi per uniformità (Tutto sotto MASSA)
-        PROV_NORM = {
-            'GE': 'GENOVA', 'SP': 'LA SPEZIA', 'SV': 'SAVONA', 'IM': 'IMPERIA', 
-            'MS': 'MASSA', 'MASSA CARRARA': 'MASSA', 'CARRARA': 'MASSA'
-        }
-
+        # Provincia e regione di ogni evento: vedi event_model.classify_place
         stats = {
             'LIGURIA': {'total': 0, 'provinces': {'GENOVA': 0, 'LA SPEZIA': 0, 'SAVONA': 0, 'IMPERIA': 0}},
             'TOSCANA': {'total': 0, 'provinces': {'MASSA': 0}},
@@ -192,53 +182,15 @@ class WordGenerator:
         }
 
         for ev in sorted_events:
-            addr = ev.get('address', '').strip().upper()
-            loc = ev.get('location', '').strip().upper()
-            
-            # 1. Tenta di estrarre la provincia dall'ultima parte dell'indirizzo
-            prov_found = None
-            if addr:
-                # Cerca pattern tipo "... - GE" o "... GENOVA" o "... (SP)"
-                parts = re.split(r'[\s\-,(]+', addr)
-                last_part = parts[-1].strip(' )')
-                if last_part in PROV_TO_REG:
-                    prov_found = PROV_NORM.get(last_part, last_part)
-            
-            # 2. Fallback: mappatura manuale per città se l'indirizzo non ha aiutato
-            if not prov_found:
-                # (Manteniamo una piccola lista di fallback per sicurezza)
-                CITY_FALLBACK = {
-                    'PEGLI': 'GENOVA', 'BOLZANETO': 'GENOVA', 'VOLTRI': 'GENOVA', 'NERVI': 'GENOVA',
-                    'SARZANA': 'LA SPEZIA', 'FOLLO': 'LA SPEZIA', 'LERICI': 'LA SPEZIA',
-                    'BRUGNATO': 'LA SPEZIA', 'PIGNONE': 'LA SPEZIA',
-                    'CARCARE': 'SAVONA', 'VARAZZE': 'SAVONA',
-                    'AULLA': 'MASSA', 'CARRARA': 'MASSA'
-                }
-                prov_found = CITY_FALLBACK.get(loc)
-
-            # 3. Assegnazione
-            if prov_found:
-                reg = PROV_TO_REG.get(prov_found) or PROV_TO_REG.get(next((k for k in PROV_NORM if PROV_NORM[k]==prov_found), ''))
-                if reg in stats:
-                    stats[reg]['total'] += 1
-                    if prov_found in stats[reg]['provinces']:
-                        stats[reg]['provinces'][prov_found] += 1
-                else:
-                    stats['ALTRO']['total'] += 1
-                    stats['ALTRO']['cities'][loc] = stats['ALTRO']['cities'].get(loc, 0) + 1
+            if ev.region in stats:
+                stats[ev.region]['total'] += 1
+                if ev.province in stats[ev.region]['provinces']:
+                    stats[ev.region]['provinces'][ev.province] += 1
             else:
-                # Se proprio non troviamo nulla, proviamo a vedere se la location stessa è una provincia
-                if loc in PROV_TO_REG:
-                    prov = PROV_NORM.get(loc, loc)
-                    reg = PROV_TO_REG[loc]
-                    stats[reg]['total'] += 1
-                    if prov in stats[reg]['provinces']:
-                        stats[reg]['provinces'][prov] += 1
-                else:
-                    stats['ALTRO']['total'] += 1
-                    # Se non è una provincia, è una città "Altro"
-                    city_key = loc if loc else 'N/D'
-                    stats['ALTRO']['cities'][city_key] = stats['ALTRO']['cities'].get(city_key, 0) + 1
+                stats['ALTRO']['total'] += 1
+                # Se non è una provincia, è una città "Altro"
+                city_key = ev.location_key if ev.location_key else 'N/D'
+                stats['ALTRO']['cities'][city_key] = stats['ALTRO']['cities'].get(city_key, 0) + 1
 
         # Regionale
         reg_parts = []
@@ -269,7 +221,7 @@ class WordGenerator:
         # Dettaglio Luoghi
         locations = {}
         for ev in sorted_events:
-            loc = ev.get('location', 'N/D').strip().upper()
+            loc = ev.location_key if 'location' in ev else 'N/D'
             locations[loc] = locations.get(loc, 0) + 1
         
         loc_str = ", ".join([f"{loc} ({count})" for loc, count in sorted(locations.items())])
@@ -320,6 +272,7 @@ class WordGenerator:
 
     def _append_external_doc(self, file_path):
         """Tenta di appendere il contenuto di un altro file docx"""
+        from docx import Document
         try:
             external_doc = Document(file_path)
             for element in external_doc.element.body:
@@ -335,6 +288,7 @@ class WordGenerator:
         Colonna 1: Titolo + Immagine evento 1
         Colonna 2: Titolo + Immagine evento 2 (se presente)
         """
+        from docx.shared import Inches
         table = self.doc.add_table(rows=1, cols=2)
         
         if show_borders:
@@ -361,6 +315,8 @@ class WordGenerator:
 
     def _insert_minimal_content(self, cell, event_data):
         """Inserisce Titolo (con Ora) + Immagine in una cella (modalità minimal)"""
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches, Pt
         p = cell.paragraphs[0]
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
         